@@ -0,0 +1,119 @@
+# all_time.py #
+# =====================================================================
+# DEFINE THE ALL-TIME TABLES OVER EVERY TOURNAMENT OF AN ARCHIVE: TEAM
+# RECORDS, SCORERS AND HOW THE HOSTS DID.
+# 
+# THE TABLES ARE BUILT MAP-REDUCE STYLE. EACH TOURNAMENT IS TURNED INTO
+# ITS OWN TOTALS(PLAIN DICTS AND LISTS), WHICH CAN BE DONE IN WORKER
+# PROCESSES, AND THE TOTALS ARE THEN MERGED IN YEAR ORDER. ROWS ARE
+# SORTED WITH NAMES AS THE LAST KEY, SO THE TABLES ARE THE SAME WHATEVER
+# THE NUMBER OF WORKERS.
+# 
+
+import re
+
+from special_classes import *
+from command_results import *
+
+
+def split_hosts(t_host):
+	"""Return the host countries of a tournament(e.g. "Korea/Japan")."""
+	
+	return [host.strip() for host in re.split(r"/|&|,| and ", t_host) if host.strip()]
+
+
+def tournament_totals(wc):
+	"""Return what one tournament adds to the all-time tables. Teams are
+	keyed by their titlecase names with rows of [WC, MP, W, D, L, GF, GA,
+	Titles], players by name with their goals."""
+	
+	prefix = wc.prefix()
+	name = wc.Symbols.name
+	
+	teams = {}
+	for t_name, team in wc.Team_IDs.items():
+		mp, w, d, l, gf, gd, pts = prefix.team_row(team)
+		teams[t_name] = [1, mp, w, d, l, gf, gf - gd, 0]
+	
+	for match in wc.Matches:
+		if match.Type == "Final" and match.Finished:
+			champion = name(match.Winner).title()
+			if champion in teams:
+				teams[champion][7] += 1
+	
+	scorers = {name(player): goals for player, goals in wc.Leaderboard.Counts.items()}
+	
+	hosts = []
+	for host in split_hosts(wc.Host):
+		t_name = host.replace(" ", "_").title()
+		if t_name in teams:
+			hosts.append([t_name, team_status(wc.Team_IDs[t_name], wc.Index),
+						  teams[t_name][1:7]])
+	
+	return {"Year": wc.Year, "Host": wc.Host, "Teams": teams, "Scorers": scorers,
+			"Hosts": hosts}
+
+
+def load_totals(loader, t_data_path):
+	"""Load a tournament and return its data version and its totals. Run
+	in worker processes, so only the totals travel back."""
+	
+	wc = loader(t_data_path)
+	return wc.Version, tournament_totals(wc)
+
+
+class AllTimeStats:
+	"""Merge the totals of several tournaments into the all-time tables."""
+	
+	__slots__ = ("Years", "Teams", "Scorers", "Hosts")
+	
+	def __init__(self, totals=()):
+		
+		self.Years = []
+		# team -> [WC, MP, W, D, L, GF, GA, Titles].
+		self.Teams = {}
+		# player -> [goals, tournaments scored in].
+		self.Scorers = {}
+		# (year, host tournament, host team, status, [MP, W, D, L, GF, GA]).
+		self.Hosts = []
+		
+		for t_totals in totals:
+			self.add(t_totals)
+	
+	def add(self, totals):
+		"""Add the totals of one tournament, in year order."""
+		
+		self.Years.append(totals["Year"])
+		
+		for team, row in totals["Teams"].items():
+			t_row = self.Teams.setdefault(team, [0] * 8)
+			for n, value in enumerate(row):
+				t_row[n] += value
+		
+		for player, goals in totals["Scorers"].items():
+			p_row = self.Scorers.setdefault(player, [0, 0])
+			p_row[0] += goals
+			p_row[1] += 1
+		
+		for team, status, row in totals["Hosts"]:
+			self.Hosts.append((totals["Year"], totals["Host"], team, status, row))
+	
+	def team_rows(self):
+		"""Return (team, row, points) from the best all-time record down,
+		by points(3 for a win), goal difference and goals scored."""
+		
+		t_rows = [(team, row, row[2] * 3 + row[3]) for team, row in self.Teams.items()]
+		return sorted(t_rows, key=lambda r: (-r[2], -(r[1][5] - r[1][6]), -r[1][5], r[0]))
+	
+	def scorer_rows(self, n=None):
+		"""Return the best n(or all) (player, goals, tournaments) from most
+		goals to least."""
+		
+		s_rows = sorted(((player, row[0], row[1]) for player, row in self.Scorers.items()),
+						key=lambda r: (-r[1], r[2], r[0]))
+		return s_rows if n is None else s_rows[:n]
+	
+	def host_rows(self):
+		"""Return how each host did, in year order."""
+		
+		return sorted(self.Hosts, key=lambda r: (r[0], r[2]))
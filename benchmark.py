@@ -0,0 +1,140 @@
+# benchmark.py #
+# =====================================================================
+# TIME THE PROGRAM ON SYNTHETIC TOURNAMENTS OF SEVERAL SIZES(SEE
+# data_generator.py): BUILDING THE MODEL FROM JSON DATA AND ANSWERING
+# THE HEAVIEST COMMANDS.
+# 
+# EACH STEP IS REPEATED AND REPORTED AS OPERATIONS PER SECOND AND
+# p50/p95/p99 LATENCY. PEAK MEMORY IS MEASURED IN A SEPARATE RUN UNDER
+# tracemalloc, SO THE TIMINGS ARE NOT SLOWED DOWN BY IT.
+# 
+# THE MODEL CACHES WHAT SOME COMMANDS BUILD(e.g. THE BRACKET AND THE
+# STANDINGS) UNTIL ITS DATA CHANGES, SO EACH COMMAND IS TIMED TWICE:
+# COLD, ON A MODEL FRESHLY BUILT(UNTIMED) BEFORE EVERY RUN, AND WARM,
+# AGAIN AND AGAIN ON ONE MODEL. THE TEXT CACHE OF CommandCache IS NOT
+# USED EITHER WAY.
+# 
+# COMMAND: python3 benchmark.py [--scales 32,128,512] [--repeat 20]
+#          [--json results.json]
+# THE JSON RESULTS CAN BE KEPT TO COMPARE ONE VERSION WITH ANOTHER.
+# 
+
+import argparse
+import gc
+import json
+import math
+import sys
+import time
+import tracemalloc
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+from fwc_explorer import initialize
+from command_functions import *
+from data_generator import *
+
+# the commands timed at every scale.
+COMMANDS = ("Team All", "Match All Verbose", "Group All Verbose", "Scorers",
+			"Bracket", "Match Vs Team_0001 Team_0002")
+
+
+def percentile(samples, p):
+	"""Return the p-th percentile of sorted samples(nearest rank)."""
+	
+	return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+
+def time_step(step, repeat, setup=None):
+	"""Run a step repeat times, return its timings and the peak memory of
+	one more run. If there is a setup, each run of the step is given what
+	setup() returns, and setup is not timed."""
+	
+	gc.collect()
+	samples = []
+	for n in range(repeat):
+		args = () if setup is None else (setup(),)
+		start = time.perf_counter()
+		step(*args)
+		samples.append(time.perf_counter() - start)
+	samples.sort()
+	
+	args = () if setup is None else (setup(),)
+	gc.collect()
+	tracemalloc.start()
+	step(*args)
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	
+	return {"runs": repeat, "ops_per_s": repeat / sum(samples),
+			"p50_ms": percentile(samples, 50) * 1000,
+			"p95_ms": percentile(samples, 95) * 1000,
+			"p99_ms": percentile(samples, 99) * 1000,
+			"peak_kb": peak / 1024}
+
+
+def run_scale(n_teams, repeat, seed=0):
+	"""Benchmark one tournament size, return the results of each step."""
+	
+	raw = json.dumps(generate_tournament(2018, n_teams, n_teams // 4, seed=seed))
+	build = lambda: initialize(json.loads(raw))
+	wc = build()
+	
+	steps = [("Load", build, None)]
+	for t_command in COMMANDS:
+		if read_command(t_command, wc, "UTC")[0]:
+			raise RuntimeError("command failed: {}".format(t_command))
+		steps.append((t_command + " (cold)",
+					  lambda model, t=t_command: read_command(t, model, "UTC"), build))
+		steps.append((t_command + " (warm)",
+					  lambda t=t_command: read_command(t, wc, "UTC"), None))
+	
+	results = {"teams": n_teams, "matches": len(wc.Matches), "data_kb": len(raw) / 1024,
+			   "steps": {}}
+	for name, step, setup in steps:
+		results["steps"][name] = time_step(step, repeat, setup)
+	return results
+
+
+def display_results(out, all_results):
+	"""Print one table per tournament size."""
+	
+	for results in all_results:
+		print("\n{} teams, {} matches, {:.0f} KB of data\n".format(
+			results["teams"], results["matches"], results["data_kb"]), file=out)
+		print("{:37}{:>10}{:>10}{:>10}{:>10}{:>12}".format(
+			"Step", "ops/s", "p50 ms", "p95 ms", "p99 ms", "peak KB"), file=out)
+		for name, r in results["steps"].items():
+			print("{:37}{:>10.1f}{:>10.2f}{:>10.2f}{:>10.2f}{:>12.0f}".format(
+				name, r["ops_per_s"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["peak_kb"]),
+				file=out)
+	print("", file=out)
+
+
+if __name__ == "__main__":
+	
+	parser = argparse.ArgumentParser(description="World Cup Explorer benchmarks")
+	parser.add_argument("--scales", default="32,128,512",
+						help="comma separated numbers of teams in groups of 4(20 or more)")
+	parser.add_argument("--repeat", type=int, default=20, help="timed runs of each step")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+	args = parser.parse_args()
+	
+	all_results = [run_scale(int(n_teams), args.repeat, args.seed)
+				   for n_teams in args.scales.split(",")]
+	display_results(sys.stdout, all_results)
+	
+	if resource is not None:
+		# kilobytes on Linux, bytes on macOS.
+		max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		print("Max resident set size: {}\n".format(max_rss))
+	else:
+		max_rss = None
+	
+	if args.json:
+		with open(args.json, "w") as jp:
+			json.dump({"python": sys.version.split()[0], "repeat": args.repeat,
+					   "max_rss": max_rss, "scales": all_results}, jp, indent=1)
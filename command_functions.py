@@ -7,147 +7,390 @@
 # ERROR CODE 1: UNRECOGNIZED COMMAND OR INVALID SYNTAX.
 # ERROR CODE 2: NO RESULTS FOUND.
 # 
+# DISPLAY FUNCTIONS WRITE INTO THE OUTPUT BUFFER THEY ARE GIVEN INSTEAD
+# OF THE TERMINAL, SO EACH COMMAND PRODUCES ONE PIECE OF TEXT THAT CAN
+# BE WRITTEN OUT AT ONCE OR SENT ANYWHERE ELSE.
+# 
+# EVERY COMMAND CAN ALSO RETURN A STRUCTURED RESULT INSTEAD OF TEXT
+# (SEE read_result AND command_results.py).
+# 
+# PARSING A COMMAND ONLY PICKS THE DISPLAY FUNCTION AND ITS ARGUMENTS.
+# COSTLY ARGUMENTS(A PREDICTION, THE ALL-TIME TABLES, HEAD-TO-HEAD
+# RECORDS) ARE PASSED AS FUNCTIONS THAT BUILD THEM WHEN THEY ARE CALLED.
+# 
 
+import io
+from collections import OrderedDict
+
+from special_classes import *
 from special_functions import *
+from command_results import *
+from outcome_sim import predict, RUN_LIMIT
+from all_time import *
 
 
-def read_command(t_command, all_matches, all_groups, parti_teams, parti_groups, wc_awards):
-	"""Interpret user's command and return a function call."""
-	
-	error_code = 0
-	
-	command_list = str(t_command).title().split(" ")
-	if command_list[-1] == "Verbose":
-		verbose = True
-		command_list.pop()
-	else:
-		verbose = False
+def parse_command(t_command, wc, user_tz, archive=None):
+	"""Interpret user's command, return the display function it calls and
+	the arguments after the output buffer, or None if the command is not
+	recognized. Records between teams cover the whole archive if one is
+	given."""
+	
+	all_matches = wc.Matches
+	all_groups = wc.Groups
+	parti_teams = wc.Teams
+	team_ids = wc.Team_IDs
+	parti_groups = wc.Group_IDs
+	wc_awards = wc.Awards
+	tm_index = wc.Index
+	symbols = wc.Symbols
+	leaderboard = wc.Leaderboard
+	
+	split = split_command(t_command)
+	if split is None:
+		return None
+	command_list, verbose, as_of = split
 	cn = len(command_list)
 	
-	if command_list[0] == "Match" and cn > 1:
+	if as_of is not None:
+		prefix = wc.prefix()
+		if command_list[0] == "Team" and cn > 1:
+			if command_list[1] != "All":
+				name_set = sorted(set(command_list[1:]))
+				return display_team_ind, (name_set, tm_index, team_ids, verbose, user_tz,
+										  prefix, as_of)
+			else:
+				return display_team_all, (parti_teams, team_ids, tm_index, prefix, as_of)
+		elif command_list[0] == "Group" and cn > 1:
+			if command_list[1] != "All":
+				name_set = sorted(set(command_list[1:]))
+			else:
+				name_set = parti_groups
+			return display_group_std, (name_set, all_groups, parti_groups, verbose,
+									   user_tz, prefix, as_of)
+		elif command_list[0] == "Scorers" and cn == 1:
+			return display_top_scorers, (leaderboard, symbols, None, prefix, as_of)
+		elif command_list[0] == "Scorers" and cn == 2 and command_list[1].isdigit():
+			return display_top_scorers, (leaderboard, symbols, int(command_list[1]),
+										 prefix, as_of)
+		else:
+			return None
+		
+	elif command_list[0] == "Match" and cn > 1:
 		if command_list[1] == "Vs" and cn == 4:
-			error_code = display_match_vs(command_list[2], command_list[3], all_matches)
+			return display_match_vs, (command_list[2], command_list[3], team_ids,
+									  tm_index, user_tz)
 		elif command_list[1] != "All":
-			name_set = set(command_list[1:])
-			error_code = display_match_ind(name_set, all_matches, parti_teams, verbose)
+			name_set = sorted(set(command_list[1:]))
+			return display_match_ind, (name_set, tm_index, team_ids, verbose, user_tz)
 		else:
-			error_code = display_match_all(all_matches, verbose)
+			return display_match_all, (all_matches, verbose, user_tz)
 		
 	elif command_list[0] == "Team" and cn > 1:
 		if command_list[1] != "All":
-			name_set = set(command_list[1:])
-			error_code = display_team_ind(name_set, all_matches, parti_teams, verbose)
+			name_set = sorted(set(command_list[1:]))
+			return display_team_ind, (name_set, tm_index, team_ids, verbose, user_tz,
+									  wc.prefix())
 		else:
-			error_code = display_team_all(parti_teams, all_matches)
+			return display_team_all, (parti_teams, team_ids, tm_index, wc.prefix())
 		
 	elif command_list[0] == "Group" and cn > 1:
 		if command_list[1] != "All":
-			name_set = set(command_list[1:])
-			error_code = display_group_std(name_set, all_groups, parti_groups, verbose)
+			name_set = sorted(set(command_list[1:]))
+			return display_group_std, (name_set, all_groups, parti_groups, verbose,
+									   user_tz)
 		else:
-			error_code = display_group_std(parti_groups, all_groups, parti_groups, verbose)
+			return display_group_std, (parti_groups, all_groups, parti_groups, verbose,
+									   user_tz)
 		
 	else:
 		if command_list[0] == "Structure" and cn == 1:
-			error_code = display_structure(all_groups)
+			return display_structure, (all_groups, symbols)
 		elif command_list[0] == "Bracket" and cn == 1:
-			error_code = display_bracket(all_matches)
+			return display_bracket, (wc.bracket(), all_groups, symbols)
 		elif command_list[0] == "Ranking" and cn == 1:
-			error_code = display_ranking(all_matches)
+			return display_ranking, (all_matches, symbols)
 		elif command_list[0] == "Awards" and cn == 1:
-			error_code = display_awards(all_matches, wc_awards)
+			return display_awards, (all_matches, wc_awards)
 		elif command_list[0] == "Scorers" and cn == 1:
-			error_code = display_top_scorers(all_matches)
+			return display_top_scorers, (leaderboard, symbols)
+		elif command_list[0] == "Scorers" and cn == 2 and command_list[1].isdigit():
+			return display_top_scorers, (leaderboard, symbols, int(command_list[1]))
+		elif command_list[0] == "Scorers" and cn > 1:
+			return display_scorer_rank, (" ".join(command_list[1:]), leaderboard,
+										 symbols)
+		elif command_list[0] == "Record" and cn in (2, 3):
+			get_h2h = wc.head_to_head if archive is None else archive.head_to_head
+			if cn == 3:
+				return display_record_vs, (command_list[1], command_list[2], get_h2h)
+			else:
+				return display_record_all, (command_list[1], get_h2h)
+		elif command_list[0] == "History" and command_list[1:] in (["Teams"], ["Scorers"],
+																	["Hosts"]):
+			return HISTORY_FUNCTIONS[command_list[1]], (all_time_source(wc, archive),)
+		elif (command_list[0] == "History" and cn == 3 and command_list[1] == "Scorers"
+				and command_list[2].isdigit()):
+			return display_all_time_scorers, (all_time_source(wc, archive),
+											  int(command_list[2]))
+		elif command_list[0] == "Predict" and cn == 1:
+			return display_prediction, (lambda: predict(wc),)
+		elif (command_list[0] == "Predict" and cn == 2 and command_list[1].isdigit()
+				and 0 < int(command_list[1]) <= RUN_LIMIT):
+			runs = int(command_list[1])
+			return display_prediction, (lambda: predict(wc, runs),)
 		elif command_list[0] == "News" and cn == 1:
-			error_code = display_news(all_matches)
+			return display_news, (all_matches,)
 		elif command_list[0] == "Upcoming" and cn == 1:
-			error_code = display_up_schedule(all_matches)
+			return display_up_schedule, (all_matches, user_tz)
 		else:
-			error_code = 1
-			
-	return error_code
+			return None
+
+
+def all_time_source(wc, archive):
+	"""Return a function that builds the all-time tables, over the whole
+	archive or over the one tournament loaded."""
+	
+	if archive is not None:
+		return archive.all_time
+	return lambda: AllTimeStats([tournament_totals(wc)])
+
+
+def read_command(t_command, wc, user_tz, archive=None):
+	"""Interpret user's command, return the error code and the output
+	text of the function call."""
+	
+	found = parse_command(t_command, wc, user_tz, archive)
+	if found is None:
+		return 1, ""
+	
+	display, args = found
+	out = io.StringIO()
+	error_code = display(out, *args)
+	return error_code, out.getvalue()
+
+
+def read_result(t_command, wc, user_tz, archive=None):
+	"""Interpret user's command, return the error code and the structured
+	result of the function call(see command_results.py). No text is
+	formatted."""
+	
+	found = parse_command(t_command, wc, user_tz, archive)
+	if found is None:
+		return 1, None
+	
+	display, args = found
+	return RESULT_FUNCTIONS[display](*args)
+
+
+def split_command(t_command):
+	"""Split a command into its words and the trailing options, which
+	are "Verbose" and "AsOf <match index>" in either order. Return None
+	if "AsOf" is misplaced."""
+	
+	command_list = str(t_command).title().split(" ")
+	verbose = False
+	as_of = None
+	
+	while len(command_list) > 1:
+		if command_list[-1] == "Verbose" and not verbose:
+			verbose = True
+			command_list.pop()
+		elif (len(command_list) > 2 and command_list[-2] == "Asof"
+				and command_list[-1].isdigit() and as_of is None):
+			as_of = int(command_list[-1])
+			del command_list[-2:]
+		else:
+			break
+	
+	if "Asof" in command_list:
+		return None
+	
+	return command_list, verbose, as_of
+
+
+def normalize_command(t_command):
+	"""Return the canonical form of a command, so that commands which
+	produce the same output(e.g. "team spain brazil" and "Team Brazil
+	Spain") share one form."""
+	
+	split = split_command(t_command)
+	if split is None:
+		return str(t_command).title()
+	command_list, verbose, as_of = split
+	
+	tail = []
+	if as_of is not None:
+		tail += ["Asof", str(as_of)]
+	if verbose:
+		tail.append("Verbose")
+	
+	if (command_list[0] in ("Match", "Team", "Group") and len(command_list) > 1
+			and command_list[1] not in ("All", "Vs")):
+		command_list = command_list[:1] + sorted(set(command_list[1:]))
+	
+	return " ".join(command_list + tail)
+
+
+class CommandCache:
+	"""Keep the output of the most recent commands so repeated queries
+	cost a dictionary lookup. Entries are keyed on the normalized command,
+	the time zone, the tournament's data version and whether the text or
+	the structured result was asked for."""
+	
+	__slots__ = ("Entries", "Maxsize", "Hits", "Misses")
+	
+	def __init__(self, maxsize=256):
+		
+		self.Entries = OrderedDict()
+		self.Maxsize = maxsize
+		self.Hits = 0
+		self.Misses = 0
+	
+	def run(self, t_command, wc, user_tz, archive=None, structured=False):
+		"""Return the error code and output text(or structured result) of
+		a command, from the cache if possible."""
+		
+		key = (normalize_command(t_command), user_tz, wc.Year, wc.Version, structured)
+		
+		result = self.Entries.get(key)
+		if result is not None:
+			self.Hits += 1
+			self.Entries.move_to_end(key)
+			return result
+		
+		self.Misses += 1
+		if structured:
+			result = read_result(t_command, wc, user_tz, archive)
+		else:
+			result = read_command(t_command, wc, user_tz, archive)
+		self.Entries[key] = result
+		if len(self.Entries) > self.Maxsize:
+			self.Entries.popitem(last=False)
+		return result
+	
+	def stats(self):
+		"""Return a short report of the cache usage."""
+		
+		return "\nCache: {} entries, {} hits, {} misses\n\n".format(
+		len(self.Entries), self.Hits, self.Misses)
 
 
 def handle_error(t_error_code):
-	"""Report issue if user's command does not yield any positive result."""
+	"""Return the issue report if user's command does not yield any
+	positive result, or an empty string."""
 	
 	if t_error_code == 0 or not t_error_code:
-		return None
+		return ""
 	elif t_error_code == 1:
-		print("\nError: unrecognized command or invalid syntax\n")
+		return "\nError: unrecognized command or invalid syntax\n\n"
 	elif t_error_code == 2:
-		print("\nError: no results found\n")
+		return "\nError: no results found\n\n"
 	else:
-		print("\nUnknown Error\n")
+		return "\nUnknown Error\n\n"
 
 
-def display_match_vs(t_1, t_2, all_matches):
+def display_match_vs(out, t_1, t_2, team_ids, tm_index, user_tz):
 	"""Show details of the match(es) between the two teams."""
 	
-	found = []
+	if t_1 not in team_ids or t_2 not in team_ids:
+		return 2
+	
+	found = tm_index.versus(team_ids[t_1], team_ids[t_2])
 	mn = 0
 	
-	for match in all_matches:
-		if t_1 in match.Teams and t_2 in match.Teams:
-			found.append(match)
-			
 	if not found:
 		return 2
 	else:
-		print("\n----- {} VS {} Details -----".format(t_1.title(), t_2.title()))
+		print("\n----- {} VS {} Details -----".format(t_1.title(), t_2.title()), file=out)
 		for f_match in found:
 			mn += 1
-			print("\n***** Match {} *****\n".format(mn))
-			f_match.display_full_detail()
-			print("")
+			print("\n***** Match {} *****\n".format(mn), file=out)
+			f_match.display_full_detail(out, user_tz)
+			print("", file=out)
 			
 		return 0
 
 
-def display_match_ind(t_name_set, all_matches, parti_teams, verbose):
+def display_record_vs(out, t_1, t_2, get_h2h):
+	"""Show the all-time record of a team against another and every
+	meeting of the two."""
+	
+	found = get_h2h().record(t_1, t_2)
+	if found is None:
+		return 2
+	meetings, record = found
+	
+	print("\n----- {} VS {} Record -----\n".format(t_1, t_2), file=out)
+	rec_msg = "Matches Played: {}\n".format(record[0])
+	rec_msg += "{} Wins: {}\n".format(t_1, record[1])
+	rec_msg += "Draws: {}\n".format(record[2])
+	rec_msg += "{} Wins: {}\n".format(t_2, record[3])
+	rec_msg += "Goals: {} - {}\n".format(record[4], record[5])
+	print(rec_msg, file=out)
+	
+	for meeting in meetings:
+		print("{} {:18}{}".format(meeting[0], meeting[3], meeting_line(meeting, t_1)),
+			  file=out)
+	
+	print("", file=out)
+	return 0
+
+
+def display_record_all(out, t_team, get_h2h):
+	"""Show the all-time record of a team against every opponent."""
+	
+	found = get_h2h().opponents(t_team)
+	if not found:
+		return 2
+	
+	print("\n----- Team {} Record Against Every Opponent -----\n".format(t_team),
+		  file=out)
+	print("Opponent        MP   W   D   L   GF   GA", file=out)
+	for t_opp, record in found:
+		print("{:<16}{:>2}   {}   {}   {}   {:>2}   {:>2}".format(t_opp, *record), file=out)
+	
+	print("", file=out)
+	return 0
+
+
+def display_match_ind(out, t_name_set, tm_index, team_ids, verbose, user_tz):
 	"""Show match results for user selected teams."""
 	
 	r_set = []
 	
 	for t_team in t_name_set:
-		if t_team in parti_teams:
+		if t_team in team_ids:
 			r_set.append(t_team)
 		else:
-			print("{} not found".format(t_team))
+			print("{} not found".format(t_team), file=out)
 	
 	if not r_set:
 		return 2
 	
 	for r_team in r_set:
-		print("\n----- Team {} Matches-----\n".format(r_team.title()))
-		found = []
-		found_uf = []
-		for match in all_matches:
-			if r_team in match.Teams:
-				if match.Finished:
-					found.append(match)
-				else:
-					found_uf.append(match)
+		r_tid = team_ids[r_team]
+		print("\n----- Team {} Matches-----\n".format(r_team.title()), file=out)
+		found = tm_index.finished(r_tid)
+		found_uf = tm_index.upcoming(r_tid)
 		
 		if found:
-			print("Match History:")
+			print("Match History:", file=out)
 			for f_match in found:
-				f_match.display_result(r_team)
+				f_match.display_result(out, r_tid)
 				if verbose:
-					f_match.display_goals(r_team)
-				print("")
+					f_match.display_goals(out, r_tid)
+				print("", file=out)
 		
 		if found_uf:
-			print("\nUpcoming Matches:")
+			print("\nUpcoming Matches:", file=out)
 			for uf_match in found_uf:
-				if uf_match.T0 != "" and uf_match.T1 != "":
-					uf_match.display_schedule(r_team)
-			print("")
+				if uf_match.T0 != NO_NAME and uf_match.T1 != NO_NAME:
+					uf_match.display_schedule(out, user_tz, r_tid)
+			print("", file=out)
 			
 	return 0
 	
 	
-def display_match_all(all_matches, verbose):
+def display_match_all(out, all_matches, verbose, user_tz):
 	"""Show history in reverse chronological order, show scheduled future
 	matches in chronological order."""
 	
@@ -164,135 +407,80 @@ def display_match_all(all_matches, verbose):
 	ufin = sorted(ufin, key=lambda i: i.Index, reverse=False)
 	
 	if fin:
-		print("\n----- All Match History -----\n")
+		print("\n----- All Match History -----\n", file=out)
 		for f_match in fin:
-			f_match.display_result()
+			f_match.display_result(out)
 			if verbose:
-				f_match.display_goals()
-			print("")
+				f_match.display_goals(out)
+			print("", file=out)
 			
 	if ufin:
-		print("\n----- Scheduled Upcoming Matches -----\n")
+		print("\n----- Scheduled Upcoming Matches -----\n", file=out)
 		for uf_match in ufin:
-			if uf_match.T0 != "" and uf_match.T1 != "": 
-				uf_match.display_schedule()
-		print("")
+			if uf_match.T0 != NO_NAME and uf_match.T1 != NO_NAME: 
+				uf_match.display_schedule(out, user_tz)
+		print("", file=out)
 		
 	return 0
 
 
-def display_team_ind(t_name_set, all_matches, parti_teams, verbose):
-	"""Show team(s) stats and its match details if verbose."""
+def display_team_ind(out, t_name_set, tm_index, team_ids, verbose, user_tz, prefix,
+					 as_of=None):
+	"""Show team(s) stats and its match details if verbose. As of a match
+	Index the later matches are left out."""
 	
 	r_set = []
 	
 	for t_team in t_name_set:
-		if t_team in parti_teams:
+		if t_team in team_ids:
 			r_set.append(t_team)
 		else:
-			print("{} not found".format(t_team))
+			print("{} not found".format(t_team), file=out)
 	
 	if not r_set:
 		return 2
 	
 	for r_team in r_set:
-		display_team_stats(r_team, all_matches)
-		fin = []
-		for match in all_matches:
-			if r_team in match.Teams and match.Finished:
-				fin.append(match)
-		fin = sorted(fin, key=lambda i: i.Index, reverse=False)
+		r_tid = team_ids[r_team]
+		display_team_stats(out, r_team, r_tid, tm_index, prefix, as_of)
+		fin = tm_index.finished(r_tid)
+		if as_of is not None:
+			fin = [f_match for f_match in fin if f_match.Index <= as_of]
 		if verbose:
 			if fin:
-				print("\n{} Match History:".format(r_team.title()))
+				print("\n{} Match History:".format(r_team.title()), file=out)
 				for f_match in fin:
-					f_match.display_result(r_team)
-			ufin = []
-			for match in all_matches:
-				if r_team in match.Teams and not match.Finished:
-					ufin.append(match)
-			if ufin:
-				print("\n{} Match Schedule:".format(r_team.title()))
+					f_match.display_result(out, r_tid)
+			ufin = tm_index.upcoming(r_tid)
+			if ufin and as_of is None:
+				print("\n{} Match Schedule:".format(r_team.title()), file=out)
 				for uf_match in ufin:
-					uf_match.display_schedule(r_team)
+					uf_match.display_schedule(out, user_tz, r_tid)
 		else:
 			if fin:
-				print("\nMost Recent:")
-				fin[-1].display_result(r_team)
-	print("")
+				print("\nMost Recent:", file=out)
+				fin[-1].display_result(out, r_tid)
+	print("", file=out)
 	return 0
 
 
-def display_team_all(parti_teams, all_matches):
+def display_team_all(out, parti_teams, team_ids, tm_index, prefix, as_of=None):
 	"""Show all teams' stats."""
 	
 	for team in parti_teams:
-		display_team_stats(team, all_matches)
+		display_team_stats(out, team, team_ids[team], tm_index, prefix, as_of)
 	
-	print("")
+	print("", file=out)
 	return 0
 
 
-def display_team_stats(t_team, all_matches):
-	"""Calculate and display various stats for a team based on the data."""
+def display_team_stats(out, t_team, t_tid, tm_index, prefix, as_of=None):
+	"""Display various stats for a team from the prefix stats, as of a
+	match Index if one is given."""
 	
-	print("\n----- Team {} Statistics-----\n".format(t_team.title()))
-	a_found = []
-	mp = 0
-	gf = 0
-	gd = 0
-	w = 0
-	d = 0
-	l = 0
-	
-	for match in all_matches:
-		if t_team in match.Teams:
-			a_found.append(match)
-	
-	a_found = sorted(a_found, key=lambda i: i.Index, reverse=False)
-	
-	for a_match in a_found:
-		if a_match.Finished:
-			mp += 1
-			if a_match.Winner == t_team:
-				w += 1
-			elif a_match.Winner == "Draw":
-				d += 1
-			else:
-				l += 1
-			for a_goal in a_match.Goals:
-				if t_team == a_goal.Team and a_goal.Type != "P":
-					gf += 1
-					gd += 1
-				elif t_team != a_goal.Team and a_goal.Type != "P":
-					gd -= 1
-	
-	last = a_found[-1]
-	
-	if last.Type == "Group" and last.Finished:
-		status = "disqualified in the group stage"
-	elif last.Type == "Group" and not last.Finished:
-		status = "still in the group stage"
-	else:
-		if not last.Finished and last.Type == "3rd Place Playoff":
-			status = "disqualified in the semi_final"
-		elif last.Finished and last.Type == "3rd Place Playoff":
-			if last.Winner == t_team:
-				status = "won the third place"
-			else:
-				status = "won the fourth place"
-		elif not last.Finished and last.Type == "Final":
-			status = "advanced to the final"
-		elif last.Finished and last.Type == "Final":
-			if last.Winner == t_team:
-				status = "won the World Cup title"
-			else:
-				status = "won the second place"
-		else:
-			if not last.Finished:
-				status = "advanced to the {}".format(last.Type)
-			else:
-				status = "disqualified in the {}".format(last.Type)
+	print("\n----- Team {} Statistics-----\n".format(t_team.title()), file=out)
+	mp, w, d, l, gf, gd, pts = prefix.team_row(t_tid, as_of)
+	status = team_status(t_tid, tm_index, as_of)
 	
 	stats_msg = "Current Status: {}\n".format(status)
 	stats_msg += "Matches Played: {}\n".format(mp)
@@ -301,13 +489,15 @@ def display_team_stats(t_team, all_matches):
 	stats_msg += "Draws: {}\n".format(d)
 	stats_msg += "Total Goals: {}\n".format(gf)
 	stats_msg += "Goal Difference: {}".format(gd)
-	print(stats_msg)
+	print(stats_msg, file=out)
 	
 	return 0
 
 
-def display_group_std(t_name_set, all_groups, parti_groups, verbose):
-	"""Show a group's current standings and the match results if verbose."""
+def display_group_std(out, t_name_set, all_groups, parti_groups, verbose, user_tz,
+					  prefix=None, as_of=None):
+	"""Show a group's current standings(or as of a match Index) and the
+	match results if verbose."""
 	
 	r_set = []
 	
@@ -315,7 +505,7 @@ def display_group_std(t_name_set, all_groups, parti_groups, verbose):
 		if t_name in parti_groups:
 			r_set.append(t_name)
 		else:
-			print("{} not found".format(t_name))
+			print("{} not found".format(t_name), file=out)
 	
 	if not r_set:
 		return 2
@@ -328,12 +518,44 @@ def display_group_std(t_name_set, all_groups, parti_groups, verbose):
 	g_list = sorted(g_list, key=lambda i: i.ID, reverse=False)
 	
 	for g_group in g_list:
-		print("\n----- Group {} Standings -----\n".format(g_group.ID))
-		g_group.display_standings()
+		print("\n----- Group {} Standings -----\n".format(g_group.ID), file=out)
+		g_group.display_standings(out, prefix, as_of)
 		if verbose:
-			print("\n----- Group {} Matches -----\n".format(g_group.ID))
-			g_group.display_m_standings()
+			print("\n----- Group {} Matches -----\n".format(g_group.ID), file=out)
+			g_group.display_m_standings(out, user_tz, as_of)
 	
-	print("")		
+	print("", file=out)		
 	return 0
 
+
+# the function building the structured result of each display function,
+# called with the same arguments but the output buffer.
+RESULT_FUNCTIONS = {
+	display_news: news_result,
+	display_up_schedule: up_schedule_result,
+	display_awards: awards_result,
+	display_top_scorers: top_scorers_result,
+	display_scorer_rank: scorer_rank_result,
+	display_ranking: ranking_result,
+	display_structure: structure_result,
+	display_bracket: bracket_result,
+	display_match_vs: match_vs_result,
+	display_record_vs: record_vs_result,
+	display_record_all: record_all_result,
+	display_match_ind: match_ind_result,
+	display_match_all: match_all_result,
+	display_team_ind: team_ind_result,
+	display_team_all: team_all_result,
+	display_group_std: group_std_result,
+	display_prediction: prediction_result,
+	display_all_time_teams: all_time_teams_result,
+	display_all_time_scorers: all_time_scorers_result,
+	display_all_time_hosts: all_time_hosts_result,
+}
+
+# the display function of each "History" table.
+HISTORY_FUNCTIONS = {
+	"Teams": display_all_time_teams,
+	"Scorers": display_all_time_scorers,
+	"Hosts": display_all_time_hosts,
+}
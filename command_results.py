@@ -0,0 +1,441 @@
+# command_results.py #
+# =====================================================================
+# DEFINE THE STRUCTURED RESULT OF EVERY COMMAND, FOR PROGRAMS THAT READ
+# THE OUTPUT INSTEAD OF PEOPLE.
+# 
+# EACH FUNCTION TAKES THE SAME ARGUMENTS AS THE DISPLAY FUNCTION OF THE
+# COMMAND(LESS THE OUTPUT BUFFER) AND RETURNS THE SAME ERROR CODE WITH
+# PLAIN DICTS AND LISTS INSTEAD OF TEXT, SO THE RESULT CAN BE SERIALIZED
+# TO JSON, CACHED OR COMPARED. NO TEXT TEMPLATES ARE FORMATTED.
+# 
+# TEAMS, PLAYERS AND STADIUMS ARE GIVEN BY NAME, UNDECIDED TEAMS AS
+# None. GOAL TYPES ARE THOSE OF THE DATA FILE("N", "O" OR "P").
+# 
+
+from special_classes import *
+from special_functions import *
+
+
+def name_or_none(symbols, t_sid):
+	"""Resolve a symbol, missing names are None."""
+	
+	return symbols.name(t_sid) or None
+
+
+def match_result(match, user_tz=None, details=False):
+	"""Return a match as a dict, with its goals and the stadium and man
+	of the match if details are asked for. Unfinished matches carry their
+	kickoff time instead of a result, in user's time zone if one is
+	given."""
+	
+	symbols = match.Symbols
+	m_result = {"index": match.Index, "id": match.ID, "type": match.Type,
+				"group": match.Group if match.Type == "Group" else None,
+				"teams": [name_or_none(symbols, team) for team in match.Teams],
+				"finished": match.Finished}
+	
+	if match.Finished:
+		m_result["score"] = [match.Score0, match.Score1]
+		if match.PSO:
+			m_result["penalties"] = [match.Pscore0, match.Pscore1]
+		else:
+			m_result["penalties"] = None
+		m_result["winner"] = name_or_none(symbols, match.Winner)
+	else:
+		m_result["kickoff_utc"] = match.Kickoff
+		if user_tz is not None:
+			m_result["kickoff"] = tz_digest(match.Kickoff, user_tz, match.Tzone)
+	
+	if details:
+		m_result["stadium"] = name_or_none(symbols, match.Stadium)
+		m_result["goals"] = [{"player": symbols.name(goal.Player),
+							  "team": symbols.name(goal.Team),
+							  "minute": goal.When, "type": goal.Type}
+							 for goal in match.Goals]
+		if match.Finished:
+			m_result["man_of_the_match"] = name_or_none(symbols, match.Man_of_the_Match)
+	
+	return m_result
+
+
+def schedule_result(matches, user_tz):
+	"""Return the matches whose teams are both known, as dicts."""
+	
+	return [match_result(match, user_tz) for match in matches
+			if match.T0 != NO_NAME and match.T1 != NO_NAME]
+
+
+def record_result(record):
+	"""Return a [MP, W, D, L, GF, GA] record as a dict."""
+	
+	return dict(zip(("played", "wins", "draws", "losses", "goals_for", "goals_against"),
+					record))
+
+
+def team_status(t_tid, tm_index, as_of=None):
+	"""Return how far a team has come, as of a match Index if one is
+	given."""
+	
+	a_found = tm_index.matches(t_tid)
+	
+	# as of a match Index, the team's next match had not been played.
+	later = [] if as_of is None else [a for a in a_found if a.Index > as_of]
+	if later:
+		last = later[0]
+		finished = False
+	else:
+		last = a_found[-1]
+		finished = last.Finished
+	
+	if last.Type == "Group" and finished:
+		return "disqualified in the group stage"
+	elif last.Type == "Group" and not finished:
+		return "still in the group stage"
+	elif not finished and last.Type == "3rd Place Playoff":
+		return "disqualified in the semi_final"
+	elif finished and last.Type == "3rd Place Playoff":
+		if last.Winner == t_tid:
+			return "won the third place"
+		return "won the fourth place"
+	elif not finished and last.Type == "Final":
+		return "advanced to the final"
+	elif finished and last.Type == "Final":
+		if last.Winner == t_tid:
+			return "won the World Cup title"
+		return "won the second place"
+	elif not finished:
+		return "advanced to the {}".format(last.Type)
+	else:
+		return "disqualified in the {}".format(last.Type)
+
+
+def team_stats_result(t_team, t_tid, tm_index, prefix, as_of=None):
+	"""Return the stats of a team as a dict."""
+	
+	mp, w, d, l, gf, gd, pts = prefix.team_row(t_tid, as_of)
+	return {"team": t_team.title(), "status": team_status(t_tid, tm_index, as_of),
+			"played": mp, "wins": w, "draws": d, "losses": l, "goals": gf,
+			"goal_difference": gd}
+
+
+def news_result(all_matches):
+	"""Return the results of the latest three matches."""
+	
+	fin = sorted([match for match in all_matches if match.Finished],
+				 key=lambda i: i.Index, reverse=True)
+	return 0, {"latest": [match_result(match) for match in fin[:3]]}
+
+
+def up_schedule_result(all_matches, user_tz):
+	"""Return the nearest three upcoming matches if any."""
+	
+	ufin = sorted([match for match in all_matches if not match.Finished],
+				  key=lambda i: i.Index)
+	return 0, {"upcoming": schedule_result(ufin[:3], user_tz)}
+
+
+def awards_result(all_matches, wc_awards):
+	"""Return the awards, which are only available once the World Cup
+	is over."""
+	
+	if not all_matches[-1].Finished or all_matches[-1].Type != "Final":
+		return 0, {"available": False, "awards": {}}
+	return 0, {"available": True, "awards": dict(wc_awards)}
+
+
+def top_scorers_result(leaderboard, symbols, top_n=None, prefix=None, as_of=None):
+	"""Return the scorers(or the best top_n) from most to least with
+	their ranks, as of a match Index if one is given."""
+	
+	if top_n is not None and top_n < 1:
+		return 1, None
+	
+	if as_of is not None:
+		scorer_list = prefix.scorers(as_of)
+		if top_n is not None:
+			scorer_list = scorer_list[:top_n + 1]
+	else:
+		scorer_list = leaderboard.scorers(top_n)
+	
+	if not scorer_list:
+		return 0, {"total": 0, "scorers": []}
+	
+	scorers = []
+	amt = scorer_list[0][1]
+	rank = 0
+	for player, amount in scorer_list[1:]:
+		if amount < amt:
+			rank += 1
+			amt = amount
+		scorers.append({"rank": rank, "player": symbols.name(player), "goals": amount})
+	
+	return 0, {"total": scorer_list[0][1], "scorers": scorers}
+
+
+def scorer_rank_result(t_player, leaderboard, symbols):
+	"""Return the goals and rank of one player."""
+	
+	pid = find_player(t_player.replace("_", " "), leaderboard, symbols)
+	found = leaderboard.rank(pid)
+	if found is None:
+		return 2, None
+	return 0, {"rank": found[1], "player": symbols.name(pid), "goals": found[0]}
+
+
+def ranking_result(all_matches, symbols):
+	"""Return the final rankings, which are only available once the
+	World Cup is over."""
+	
+	if not all_matches[-1].Finished or all_matches[-1].Type != "Final":
+		return 0, {"available": False}
+	
+	n1, n2, n3, n4, b8, b16 = final_ranking(all_matches)
+	return 0, {"available": True, "champion": symbols.name(n1),
+			   "runners_up": symbols.name(n2), "third_place": symbols.name(n3),
+			   "fourth_place": symbols.name(n4),
+			   "round_of_8": [symbols.name(t) for t in b8],
+			   "round_of_16": [symbols.name(t) for t in b16]}
+
+
+def structure_result(all_groups, symbols):
+	"""Return the teams of every group."""
+	
+	return 0, {"groups": [{"id": group.ID,
+						   "teams": [symbols.name(team) for team in group.Teams]}
+						  for group in all_groups]}
+
+
+def bracket_result(bracket, all_groups, symbols):
+	"""Return the knockout rounds and every knockout match as a node
+	with the IDs of its feeders. First round teams carry their group
+	label(e.g. A1)."""
+	
+	if bracket.Root is None:
+		return 0, {"rounds": [], "root": None, "third_place": None, "nodes": [],
+				   "labels": {}}
+	
+	nodes = []
+	for mid, (match, feeders) in sorted(bracket.Nodes.items(),
+										key=lambda n: n[1][0].Index):
+		node = match_result(match)
+		node["feeders"] = list(feeders)
+		nodes.append(node)
+	
+	third = None
+	if bracket.Third is not None:
+		third = match_result(bracket.Third)
+	
+	labels = {symbols.name(team): label
+			  for team, label in bracket_labels(bracket, all_groups).items()}
+	
+	return 0, {"rounds": list(bracket.Rounds), "root": bracket.Root.ID,
+			   "third_place": third, "nodes": nodes, "labels": labels}
+
+
+def match_vs_result(t_1, t_2, team_ids, tm_index, user_tz):
+	"""Return the full details of the match(es) between two teams."""
+	
+	if t_1 not in team_ids or t_2 not in team_ids:
+		return 2, None
+	
+	found = tm_index.versus(team_ids[t_1], team_ids[t_2])
+	if not found:
+		return 2, None
+	
+	return 0, {"teams": [t_1.title(), t_2.title()],
+			   "matches": [match_result(match, user_tz, True) for match in found]}
+
+
+def record_vs_result(t_1, t_2, get_h2h):
+	"""Return the all-time record of a team against another and every
+	meeting of the two."""
+	
+	found = get_h2h().record(t_1, t_2)
+	if found is None:
+		return 2, None
+	meetings, record = found
+	
+	m_list = []
+	for year, index, mid, m_type, group, teams, score, penalties, winner in meetings:
+		m_list.append({"index": index, "id": mid, "type": m_type,
+					   "group": group if m_type == "Group" else None,
+					   "teams": [team or None for team in teams], "finished": True,
+					   "score": list(score),
+					   "penalties": list(penalties) if penalties else None,
+					   "winner": winner or None, "year": year})
+	
+	return 0, {"teams": [t_1, t_2], "record": record_result(record),
+			   "meetings": m_list}
+
+
+def record_all_result(t_team, get_h2h):
+	"""Return the all-time record of a team against every opponent."""
+	
+	found = get_h2h().opponents(t_team)
+	if not found:
+		return 2, None
+	
+	o_list = []
+	for t_opp, record in found:
+		o_result = {"opponent": t_opp}
+		o_result.update(record_result(record))
+		o_list.append(o_result)
+	
+	return 0, {"team": t_team, "opponents": o_list}
+
+
+def match_ind_result(t_name_set, tm_index, team_ids, verbose, user_tz):
+	"""Return the match results and upcoming matches of the selected
+	teams, with the goals if verbose."""
+	
+	not_found = [t_team for t_team in t_name_set if t_team not in team_ids]
+	r_set = [t_team for t_team in t_name_set if t_team in team_ids]
+	if not r_set:
+		return 2, None
+	
+	teams = []
+	for r_team in r_set:
+		r_tid = team_ids[r_team]
+		teams.append({"team": r_team.title(),
+					  "history": [match_result(match, None, verbose)
+								  for match in tm_index.finished(r_tid)],
+					  "upcoming": schedule_result(tm_index.upcoming(r_tid), user_tz)})
+	
+	return 0, {"not_found": not_found, "teams": teams}
+
+
+def match_all_result(all_matches, verbose, user_tz):
+	"""Return the history in reverse chronological order and the
+	scheduled future matches in chronological order."""
+	
+	fin = sorted([match for match in all_matches if match.Finished],
+				 key=lambda i: i.Index, reverse=True)
+	ufin = sorted([match for match in all_matches if not match.Finished],
+				  key=lambda i: i.Index)
+	
+	return 0, {"history": [match_result(match, None, verbose) for match in fin],
+			   "upcoming": schedule_result(ufin, user_tz)}
+
+
+def team_ind_result(t_name_set, tm_index, team_ids, verbose, user_tz, prefix,
+					as_of=None):
+	"""Return the stats of the selected teams, with their match history
+	and schedule if verbose or else their most recent match. As of a
+	match Index the later matches are left out."""
+	
+	not_found = [t_team for t_team in t_name_set if t_team not in team_ids]
+	r_set = [t_team for t_team in t_name_set if t_team in team_ids]
+	if not r_set:
+		return 2, None
+	
+	teams = []
+	for r_team in r_set:
+		r_tid = team_ids[r_team]
+		t_result = team_stats_result(r_team, r_tid, tm_index, prefix, as_of)
+		fin = tm_index.finished(r_tid)
+		if as_of is not None:
+			fin = [f_match for f_match in fin if f_match.Index <= as_of]
+		if verbose:
+			t_result["history"] = [match_result(f_match) for f_match in fin]
+			if as_of is None:
+				t_result["schedule"] = [match_result(uf_match, user_tz)
+										for uf_match in tm_index.upcoming(r_tid)]
+		else:
+			t_result["most_recent"] = match_result(fin[-1]) if fin else None
+		teams.append(t_result)
+	
+	return 0, {"not_found": not_found, "teams": teams}
+
+
+def team_all_result(parti_teams, team_ids, tm_index, prefix, as_of=None):
+	"""Return all teams' stats."""
+	
+	return 0, {"teams": [team_stats_result(team, team_ids[team], tm_index, prefix, as_of)
+						 for team in parti_teams]}
+
+
+def group_std_result(t_name_set, all_groups, parti_groups, verbose, user_tz,
+					 prefix=None, as_of=None):
+	"""Return the standings of the selected groups(or as of a match
+	Index), with their matches if verbose."""
+	
+	not_found = [t_name for t_name in t_name_set if t_name not in parti_groups]
+	r_set = [t_name for t_name in t_name_set if t_name in parti_groups]
+	if not r_set:
+		return 2, None
+	
+	g_list = sorted([group for group in all_groups if group.ID in r_set],
+					key=lambda i: i.ID)
+	
+	groups = []
+	for g_group in g_list:
+		standings = []
+		for team, row in g_group.standing_rows(prefix, as_of):
+			s_row = {"team": g_group.Symbols.name(team)}
+			s_row.update(zip(("played", "wins", "draws", "losses", "goals_for",
+							  "goal_difference", "points"), row))
+			standings.append(s_row)
+		g_result = {"id": g_group.ID, "standings": standings}
+		if verbose:
+			fin, ufin = g_group.match_lists(as_of)
+			g_result["finished"] = [match_result(match) for match in fin]
+			g_result["upcoming"] = [match_result(match, user_tz) for match in ufin]
+		groups.append(g_result)
+	
+	return 0, {"not_found": not_found, "groups": groups}
+
+
+def prediction_result(get_prediction):
+	"""Return every team's chances of reaching each knockout round and of
+	winning the title."""
+	
+	prediction = get_prediction()
+	teams = []
+	for name, chances, title in prediction.rows():
+		teams.append({"team": name,
+					  "reach": {r_type: round(c, 4) for r_type, c in zip(prediction.Rounds,
+																		chances)},
+					  "champion": round(title, 4)})
+	
+	return 0, {"runs": prediction.Runs, "unfinished": prediction.Unfinished,
+			   "rounds": list(prediction.Rounds), "teams": teams}
+
+
+def all_time_teams_result(get_stats):
+	"""Return the all-time record of every team over the tournaments."""
+	
+	stats = get_stats()
+	teams = []
+	for team, row, pts in stats.team_rows():
+		t_result = {"team": team}
+		t_result.update(zip(("world_cups", "played", "wins", "draws", "losses",
+							 "goals_for", "goals_against", "titles"), row))
+		t_result["points"] = pts
+		teams.append(t_result)
+	
+	return 0, {"years": list(stats.Years), "teams": teams}
+
+
+def all_time_scorers_result(get_stats, top_n=None):
+	"""Return the all-time scorers(or the best top_n) from most to least."""
+	
+	if top_n is not None and top_n < 1:
+		return 1, None
+	
+	stats = get_stats()
+	return 0, {"years": list(stats.Years),
+			   "scorers": [{"player": player, "goals": goals, "world_cups": wcs}
+						   for player, goals, wcs in stats.scorer_rows(top_n)]}
+
+
+def all_time_hosts_result(get_stats):
+	"""Return how the hosts did in their own tournaments."""
+	
+	stats = get_stats()
+	hosts = []
+	for year, wc_host, team, status, row in stats.host_rows():
+		h_result = {"year": year, "host": wc_host, "team": team, "status": status}
+		h_result.update(record_result(row))
+		hosts.append(h_result)
+	
+	return 0, {"years": list(stats.Years), "hosts": hosts}
@@ -0,0 +1,332 @@
+# data_generator.py #
+# =====================================================================
+# DEFINE A GENERATOR OF SYNTHETIC TOURNAMENT DATA IN THE LAYOUT OF
+# data_template.json, FOR BENCHMARKS AND FOR TRYING THE PROGRAM ON
+# TOURNAMENTS MUCH LARGER THAN A REAL WORLD CUP.
+# 
+# TEAMS ARE SPLIT INTO GROUPS(5 OR MORE, OF 4 OR MORE TEAMS) THAT PLAY
+# A ROUND ROBIN. THE BEST TWO OF EACH GROUP GO THROUGH TO A KNOCKOUT
+# STAGE OF A ROUND OF 16 OR MORE(AS THE Ranking COMMAND EXPECTS) WITH
+# A 3RD PLACE PLAYOFF. IF THE NUMBER OF GROUPS IS NOT A POWER OF TWO
+# (e.g. 48 TEAMS IN 12 GROUPS), THE BEST 3RD PLACED TEAMS FILL THE FIRST
+# ROUND UP TO THE NEXT POWER OF TWO, IN SLOTS "Best 1", "Best 2", ...
+# THAT ARE ONLY KNOWN WHEN EVERY GROUP IS OVER. KNOCKOUT MATCHES GIVE
+# THEIR "Slots" AND "Feeders". GOALS PER MATCH ARE POISSON DRAWS, DRAWN
+# KNOCKOUT MATCHES ARE DECIDED BY A PENALTY SHOOTOUT.
+# 
+# ONLY THE FIRST PART OF THE MATCHES CAN BE PLAYED(--finished), TEAMS
+# OF KNOCKOUT MATCHES THAT ARE NOT DECIDED YET ARE LEFT EMPTY.
+# 
+# COMMAND: python3 data_generator.py <output> [--teams 32] [--groups 8]
+#          [--goals 2.6] [--finished 1.0] [--tournaments 1] [--seed 0]
+# WITH MORE THAN ONE TOURNAMENT THE OUTPUT IS A DIRECTORY OF DATA FILES
+# (ONE PER YEAR) THAT CAN BE OPENED WITH --archive.
+# 
+
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+
+from outcome_sim import poisson
+
+# players in a squad.
+SQUAD = 23
+# chance of a goal being an own goal.
+OWN_GOAL = 0.03
+# a match is 90 minutes, knockout matches may go on to 120.
+MINUTES = 90
+
+
+def group_ids(n_groups):
+	"""Return group IDs A, B, ... and G27, G28, ... past the alphabet."""
+	
+	return [chr(65 + n) if n < 26 else "G{}".format(n + 1) for n in range(n_groups)]
+
+
+def knockout_name(n_teams):
+	"""Return the match type of a knockout round with n_teams teams."""
+	
+	if n_teams == 2:
+		return "Final"
+	elif n_teams == 4:
+		return "Semi-final"
+	return "Round of {}".format(n_teams)
+
+
+class TournamentGenerator:
+	"""Build the raw json data of one synthetic tournament."""
+	
+	__slots__ = ("Rng", "Year", "Goals", "Squads", "Matches", "IDs", "Per_day")
+	
+	def __init__(self, year, goals, seed, per_day=4):
+		
+		self.Rng = random.Random("{}-{}".format(seed, year))
+		self.Year = year
+		self.Goals = goals
+		self.Squads = {}
+		self.Matches = []
+		self.IDs = set()
+		self.Per_day = per_day
+	
+	def squad(self, team):
+		"""Return the players of a team."""
+		
+		if team not in self.Squads:
+			self.Squads[team] = ["{} Player {:02}".format(team.replace("_", " "), n + 1)
+								 for n in range(SQUAD)]
+		return self.Squads[team]
+	
+	def match_id(self, index):
+		"""Return the ID(MMDDHH) of the match with an Index, with a suffix
+		if another match already kicks off at the same time."""
+		
+		day = datetime.date(int(self.Year), 6, 14) + datetime.timedelta(
+		days=(index - 1) // self.Per_day)
+		hour = 12 + 3 * ((index - 1) % 4)
+		mid = "{:02}{:02}{:02}".format(day.month, day.day, hour)
+		
+		base = mid
+		n = 1
+		while mid in self.IDs:
+			n += 1
+			mid = "{}_{}".format(base, n)
+		self.IDs.add(mid)
+		return mid
+	
+	def add_match(self, teams, m_type, group, finished, extra=None):
+		"""Add a match, play it if it is finished and return its json."""
+		
+		index = len(self.Matches) + 1
+		mid = self.match_id(index)
+		j_match = {"ID": mid, "Index": index, "Tzone": 3, "Teams": list(teams),
+				   "Type": m_type, "Group": group}
+		j_match.update(extra or {})
+		j_match.update({"Stadium": "Stadium {}".format(index % 12 + 1),
+						"Finished": False, "Goals": [], "Winner": "",
+						"Man_of_the_Match": ""})
+		
+		if finished and "" not in teams:
+			self.play(j_match, m_type != "Group")
+		self.Matches.append(j_match)
+		return j_match
+	
+	def play(self, j_match, knockout):
+		"""Draw the goals of a match and its winner."""
+		
+		rng = self.Rng
+		teams = j_match["Teams"]
+		mid = j_match["ID"]
+		scores = [poisson(rng, self.Goals / 2) for team in teams]
+		minutes = MINUTES
+		if knockout and scores[0] == scores[1]:
+			minutes = MINUTES + 30
+			for n in range(2):
+				scores[n] += poisson(rng, self.Goals / 6)
+		
+		goals = []
+		for n, team in enumerate(teams):
+			for k in range(scores[n]):
+				if rng.random() < OWN_GOAL:
+					player = rng.choice(self.squad(teams[1 - n]))
+					g_type = "O"
+				else:
+					player = rng.choice(self.squad(team))
+					g_type = "N"
+				goals.append({"Type": g_type, "MID": mid, "Team": team,
+							  "When": rng.randint(1, minutes), "Player": player})
+		goals.sort(key=lambda g: g["When"])
+		
+		if scores[0] > scores[1]:
+			winner = teams[0]
+		elif scores[1] > scores[0]:
+			winner = teams[1]
+		elif not knockout:
+			winner = "Draw"
+		else:
+			winner = self.shootout(j_match, goals)
+		
+		j_match["Finished"] = True
+		j_match["Goals"] = goals
+		j_match["Winner"] = winner
+		j_match["Man_of_the_Match"] = rng.choice(self.squad(rng.choice(teams)))
+	
+	def shootout(self, j_match, goals):
+		"""Add the scored penalties of a shootout, return the winner."""
+		
+		rng = self.Rng
+		teams = j_match["Teams"]
+		scored = [0, 0]
+		kick = 0
+		while kick < 5 or scored[0] == scored[1]:
+			for n, team in enumerate(teams):
+				if rng.random() < 0.75:
+					scored[n] += 1
+					goals.append({"Type": "P", "MID": j_match["ID"], "Team": team,
+								  "When": 150, "Player": self.squad(team)[kick % SQUAD]})
+			kick += 1
+		return teams[0] if scored[0] > scored[1] else teams[1]
+	
+	def result(self, j_match):
+		"""Return the winner and loser of a finished knockout match, or
+		empty names."""
+		
+		if not j_match["Finished"]:
+			return "", ""
+		winner = j_match["Winner"]
+		loser = [team for team in j_match["Teams"] if team != winner][0]
+		return winner, loser
+
+
+def generate_tournament(year, n_teams=32, n_groups=8, goals=2.6, finished=1.0, seed=0):
+	"""Return the raw json data of a synthetic tournament. The first
+	"finished" share of the matches(by Index) are played."""
+	
+	if n_groups < 5 or n_teams % n_groups:
+		raise ValueError("groups must be 5 or more and divide the teams")
+	if n_teams // n_groups < 4:
+		raise ValueError("groups need at least four teams")
+	
+	per_group = n_teams // n_groups
+	qualifiers = 2
+	while qualifiers < 2 * n_groups:
+		qualifiers *= 2
+	best = qualifiers - 2 * n_groups
+	total = n_groups * per_group * (per_group - 1) // 2 + qualifiers
+	played = math.floor(total * finished)
+	gen = TournamentGenerator(str(year), goals, seed, max(4, math.ceil(total / 60)))
+	
+	g_ids = group_ids(n_groups)
+	groups = []
+	tables = {}
+	for n, g_id in enumerate(g_ids):
+		teams = ["Team_{:04}".format(n * per_group + k + 1) for k in range(per_group)]
+		groups.append({"ID": g_id, "Teams": teams, "Matches": []})
+		tables[g_id] = {team: [0, 0, 0] for team in teams}
+	
+	# every group plays one round of its round robin after another.
+	for a, b in [(a, b) for gap in range(1, per_group)
+				 for a in range(per_group) for b in range(per_group) if b - a == gap]:
+		for group in groups:
+			teams = (group["Teams"][a], group["Teams"][b])
+			j_match = gen.add_match(teams, "Group", group["ID"],
+									len(gen.Matches) < played)
+			group["Matches"].append(j_match["ID"])
+			if j_match["Finished"]:
+				scores = [sum(1 for g in j_match["Goals"] if g["Team"] == t) for t in teams]
+				for n, team in enumerate(teams):
+					row = tables[group["ID"]][team]
+					row[0] += 3 if scores[n] > scores[1 - n] else 1 if scores[0] == scores[1] else 0
+					row[1] += scores[n] - scores[1 - n]
+					row[2] += scores[n]
+	
+	places = {}
+	others = []
+	for group in groups:
+		done = all(j_match["Finished"] for j_match in gen.Matches
+				   if j_match["Group"] == group["ID"])
+		order = sorted(group["Teams"], key=lambda t: [-v for v in tables[group["ID"]][t]])
+		for n, team in enumerate(order):
+			places["{}{}".format(group["ID"], n + 1)] = team if done else ""
+			if n >= 2:
+				others.append([n] + [-v for v in tables[group["ID"]][team]] + [team])
+	
+	# the best teams placed 3rd(then 4th) over all groups fill the rest.
+	all_done = all(places[g_id + "1"] for g_id in g_ids)
+	for n, row in enumerate(sorted(others)[:best]):
+		places["Best {}".format(n + 1)] = row[-1] if all_done else ""
+	
+	if not best:
+		# group winners meet the runners-up of the paired group(A1-B2,
+		# B1-A2, ...).
+		first = [slots for n in range(0, n_groups, 2)
+				 for slots in ((g_ids[n] + "1", g_ids[n + 1] + "2"),
+							   (g_ids[n + 1] + "1", g_ids[n] + "2"))]
+	else:
+		# seeded: group winners, runners-up, then the best of the rest,
+		# the first seed meets the last.
+		seeds = ([g_id + "1" for g_id in g_ids] + [g_id + "2" for g_id in reversed(g_ids)]
+				 + ["Best {}".format(n + 1) for n in range(best)])
+		first = [(seeds[n], seeds[-1 - n]) for n in range(qualifiers // 2)]
+	
+	prev = []
+	for slots in first:
+		teams = [places[slot] for slot in slots]
+		prev.append(gen.add_match(teams, knockout_name(2 * len(first)), "None",
+								  len(gen.Matches) < played, {"Slots": list(slots)}))
+	
+	semis = []
+	while len(prev) > 1:
+		if len(prev) == 2:
+			semis = prev
+			losers = [gen.result(j_match)[1] for j_match in semis]
+			gen.add_match(losers, "3rd Place Playoff", "None", len(gen.Matches) < played,
+						  {"Feeders": [j_match["Index"] for j_match in semis]})
+		cur = []
+		for n in range(0, len(prev), 2):
+			pair = prev[n:n + 2]
+			teams = [gen.result(j_match)[0] for j_match in pair]
+			cur.append(gen.add_match(teams, knockout_name(len(prev)), "None",
+									 len(gen.Matches) < played,
+									 {"Feeders": [j_match["Index"] for j_match in pair]}))
+		prev = cur
+	
+	awards = {}
+	final = prev[0]
+	if final["Finished"]:
+		scorers = {}
+		for j_match in gen.Matches:
+			for j_goal in j_match["Goals"]:
+				if j_goal["Type"] == "N":
+					scorers[j_goal["Player"]] = scorers.get(j_goal["Player"], 0) + 1
+		rng = gen.Rng
+		awards = {"Golden Ball": final["Man_of_the_Match"],
+				  "Golden Boot": max(sorted(scorers), key=lambda p: scorers[p], default=""),
+				  "Golden Glove": gen.squad(rng.choice(final["Teams"]))[0],
+				  "Best Young Player": rng.choice(gen.squad(rng.choice(final["Teams"]))),
+				  "FIFA Fair Play Trophy": rng.choice(list(gen.Squads)).replace("_", " ")}
+	
+	return {"Meta": {"Year": str(year), "Host": "Team_0001",
+					 "Tournament_No.": str((int(year) - 1930) // 4 + 1)},
+			"Matches": gen.Matches, "Groups": groups, "Awards": awards}
+
+
+def write_data(t_path, n_tournaments=1, **options):
+	"""Write one data file, or a directory of data files one per year
+	(1930, 1934, ...) if there is more than one tournament."""
+	
+	if n_tournaments == 1:
+		with open(t_path, "w") as jp:
+			json.dump(generate_tournament(2018, **options), jp, indent=1)
+		return [t_path]
+	
+	os.makedirs(t_path, exist_ok=True)
+	d_paths = []
+	for n in range(n_tournaments):
+		year = 1930 + 4 * n
+		d_path = os.path.join(t_path, "{}.json".format(year))
+		with open(d_path, "w") as jp:
+			json.dump(generate_tournament(year, **options), jp, indent=1)
+		d_paths.append(d_path)
+	return d_paths
+
+
+if __name__ == "__main__":
+	
+	parser = argparse.ArgumentParser(description="Synthetic tournament data")
+	parser.add_argument("output", help="data file, or directory for several tournaments")
+	parser.add_argument("--teams", type=int, default=32)
+	parser.add_argument("--groups", type=int, default=8)
+	parser.add_argument("--goals", type=float, default=2.6, help="mean goals per match")
+	parser.add_argument("--finished", type=float, default=1.0,
+						help="share of the matches already played")
+	parser.add_argument("--tournaments", type=int, default=1)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+	
+	for d_path in write_data(args.output, args.tournaments, n_teams=args.teams,
+							 n_groups=args.groups, goals=args.goals,
+							 finished=args.finished, seed=args.seed):
+		print(d_path)
@@ -0,0 +1,60 @@
+# data_snapshot.py #
+# =====================================================================
+# DEFINE A BINARY SNAPSHOT CACHE FOR THE FULLY BUILT TOURNAMENT MODEL.
+# 
+# THE SNAPSHOT IS STORED NEXT TO THE DATA FILE(e.g. fifa_data.json.snapshot)
+# AND IS ONLY USED WHEN THE SIZE, MODIFICATION TIME AND CONTENT HASH OF
+# THE DATA FILE ALL MATCH THE ONES RECORDED WITH IT. ON A HIT THE MODEL
+# IS RESTORED DIRECTLY WITHOUT PARSING JSON OR DERIVING MATCH FACTS.
+# 
+# BUMP SNAPSHOT_VERSION WHENEVER THE MODEL CLASSES CHANGE SHAPE SO OLD
+# SNAPSHOTS ARE REBUILT INSTEAD OF RESTORED.
+# 
+
+import hashlib
+import os
+import pickle
+
+SNAPSHOT_VERSION = 12
+
+
+def snapshot_path(t_data_path):
+	"""Return the snapshot file path for a data file."""
+	
+	return t_data_path + ".snapshot"
+
+
+def data_key(t_data_path, t_raw):
+	"""Identify a data file by its size, modification time and hash."""
+	
+	st = os.stat(t_data_path)
+	return (SNAPSHOT_VERSION, st.st_size, st.st_mtime_ns,
+			hashlib.sha256(t_raw).hexdigest())
+
+
+def read_snapshot(t_data_path, t_key):
+	"""Return the model stored in the snapshot, or None if the snapshot
+	is missing, unreadable or was built from different data."""
+	
+	try:
+		with open(snapshot_path(t_data_path), "rb") as sp:
+			if pickle.load(sp) != t_key:
+				return None
+			return pickle.load(sp)
+	except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+		return None
+
+
+def write_snapshot(t_data_path, t_key, wc):
+	"""Store the model in the snapshot, silently skip unwritable places."""
+	
+	s_path = snapshot_path(t_data_path)
+	tmp_path = s_path + ".tmp"
+	
+	try:
+		with open(tmp_path, "wb") as sp:
+			pickle.dump(t_key, sp, pickle.HIGHEST_PROTOCOL)
+			pickle.dump(wc, sp, pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp_path, s_path)
+	except OSError:
+		pass
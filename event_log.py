@@ -0,0 +1,296 @@
+# event_log.py #
+# =====================================================================
+# DEFINE AN APPEND-ONLY EVENT LOG FOR MATCH UPDATES, SO A FEED CAN ADD
+# ONE GOAL OR RESULT WITHOUT REWRITING THE WHOLE DATA FILE.
+# 
+# THE LOG LIVES NEXT TO THE DATA FILE(e.g. fifa_data.json.events) AND
+# HOLDS ONE JSON OBJECT PER LINE. SUPPORTED EVENTS:
+# 
+# {"Event": "Scheduled", "Match": {...}}
+#     ADD A MATCH OR UPDATE ITS FIELDS(e.g. THE TEAMS OF A KNOCKOUT
+#     MATCH), USING THE MATCH LAYOUT OF data_template.json.
+# {"Event": "Goal", "Goal": {"Type": "N", "MID": "", "Team": "",
+#                            "When": 0, "Player": ""}}
+# {"Event": "Finished", "MID": "", "Winner": "", "Man_of_the_Match": ""}
+# {"Event": "Award", "Award": "Golden Ball", "Winner": ""}
+# 
+# THE LOADED MODEL REMEMBERS HOW FAR THE LOG HAS BEEN REPLAYED, SO A
+# MODEL RESTORED FROM THE SNAPSHOT ONLY REPLAYS NEWER EVENTS. COMPACTION
+# WRITES EVERYTHING BACK INTO THE DATA FILE AND KEEPS ONLY THE EVENTS
+# LOGGED AFTER THE REPLAYED ONES. APPENDS AND COMPACTION TAKE A LOCK
+# FILE(e.g. fifa_data.json.events.lock), SO NO EVENT IS LOST BETWEEN THE
+# REPLAY AND THE REWRITE OF THE LOG. THE LOCK FILE HOLDS THE PID OF ITS
+# OWNER AND THE TIME IT WAS TAKEN, A LOCK LEFT BY A PROCESS THAT IS GONE
+# (OR OLDER THAN STALE_LOCK SECONDS) IS BROKEN.
+# 
+# WHEN THE DATA FILE IS WATCHED(--watch), LogWatcher APPLIES THE WHOLE
+# LOG ON TOP OF EVERY NEW VERSION OF THE FILE BEFORE IT IS COMPARED WITH
+# THE MODEL, SO A REWRITE OF THE FILE DOES NOT UNDO THE LOGGED EVENTS.
+# 
+# COMMANDS: python3 event_log.py append '<event json>' [data file]
+#           python3 event_log.py compact [data file]
+# 
+
+import contextlib
+import json
+import os
+import sys
+import time
+
+from live_update import *
+
+# seconds after which a lock is broken even if its owner seems alive.
+STALE_LOCK = 60.0
+# the raw json data of a match added by a "Scheduled" event.
+NEW_MATCH = {"Stadium": "", "Finished": False, "Goals": [], "Winner": "",
+			 "Man_of_the_Match": ""}
+
+
+def log_path(t_data_path):
+	"""Return the event log path for a data file."""
+	
+	return t_data_path + ".events"
+
+
+def lock_owner(lock_path):
+	"""Return the content of a lock file and whether it is stale: its
+	owner process is gone, or it was taken more than STALE_LOCK seconds
+	ago. A lock file not written yet is dated by its modification time.
+	Return None if there is no lock file."""
+	
+	try:
+		with open(lock_path, "rb") as fp:
+			owner = fp.read()
+		taken = os.stat(lock_path).st_mtime
+	except OSError:
+		return None
+	
+	try:
+		pid, taken = int(owner.split()[0]), float(owner.split()[1])
+	except (ValueError, IndexError):
+		return owner, time.time() - taken > STALE_LOCK
+	
+	if time.time() - taken > STALE_LOCK:
+		return owner, True
+	if os.name == "posix" and pid != os.getpid():
+		try:
+			os.kill(pid, 0)
+		except ProcessLookupError:
+			return owner, True
+		except PermissionError:
+			pass
+	return owner, False
+
+
+def break_lock(lock_path, owner):
+	"""Remove a stale lock file, unless another process took the lock
+	again in the meantime."""
+	
+	stale_path = "{}.{}".format(lock_path, os.getpid())
+	try:
+		os.rename(lock_path, stale_path)
+	except OSError:
+		return
+	
+	with open(stale_path, "rb") as fp:
+		if fp.read() != owner:
+			# not the stale lock any more, give it back.
+			os.rename(stale_path, lock_path)
+			return
+	os.remove(stale_path)
+
+
+@contextlib.contextmanager
+def log_lock(t_data_path, timeout=10.0):
+	"""Hold the lock file of a data file's log, waiting for up to timeout
+	seconds. Stale locks are broken."""
+	
+	lock_path = log_path(t_data_path) + ".lock"
+	deadline = time.monotonic() + timeout
+	while True:
+		try:
+			fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+			break
+		except FileExistsError:
+			found = lock_owner(lock_path)
+			if found is not None and found[1]:
+				break_lock(lock_path, found[0])
+				continue
+			if time.monotonic() > deadline:
+				raise TimeoutError("Event log is locked: {}".format(lock_path))
+			time.sleep(0.01)
+	
+	os.write(fd, "{} {}".format(os.getpid(), time.time()).encode("ascii"))
+	try:
+		yield
+	finally:
+		os.close(fd)
+		os.remove(lock_path)
+
+
+def append_event(t_data_path, event):
+	"""Append one event to the log of a data file."""
+	
+	with log_lock(t_data_path):
+		with open(log_path(t_data_path), "a", encoding="utf-8") as lp:
+			lp.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def read_events(t_data_path, t_offset=0):
+	"""Return the complete events logged after a byte offset and the
+	offset right after them. A half written last line is left for the
+	next read."""
+	
+	try:
+		with open(log_path(t_data_path), "rb") as lp:
+			lp.seek(t_offset)
+			chunk = lp.read()
+	except OSError:
+		return [], t_offset
+	
+	end = chunk.rfind(b"\n") + 1
+	events = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+	
+	return events, t_offset + end
+
+
+def event_mid(event):
+	"""Return the ID of the match an event refers to, or None for an
+	award."""
+	
+	e_type = event["Event"]
+	
+	if e_type == "Award":
+		return None
+	elif e_type == "Scheduled":
+		return event["Match"]["ID"]
+	elif e_type == "Goal":
+		return event["Goal"]["MID"]
+	elif e_type == "Finished":
+		return event["MID"]
+	raise ValueError("Unknown event type: {}".format(e_type))
+
+
+def event_match(j_match, event):
+	"""Return the raw json data of a match(None if it is not known yet)
+	with a match event applied."""
+	
+	e_type = event["Event"]
+	
+	if j_match is None:
+		if e_type != "Scheduled":
+			raise ValueError("Event for an unknown match: {}".format(event_mid(event)))
+		j_match = dict(NEW_MATCH, Goals=[])
+	
+	if e_type == "Scheduled":
+		j_match.update(event["Match"])
+	elif e_type == "Goal":
+		j_match["Goals"].append(event["Goal"])
+	else:
+		j_match["Finished"] = True
+		j_match["Winner"] = event["Winner"]
+		j_match["Man_of_the_Match"] = event["Man_of_the_Match"]
+	
+	return j_match
+
+
+def apply_event(wc, event):
+	"""Replay one event into the model, only the match it refers to is
+	read again."""
+	
+	mid = event_mid(event)
+	
+	if mid is None:
+		wc.Awards[event["Award"]] = event["Winner"]
+		return
+	
+	match = wc.Registry.get(mid)
+	apply_match(wc, event_match(None if match is None else match.to_json(), event))
+
+
+def replay_log(wc, t_data_path):
+	"""Replay the events the model has not seen yet, return how many
+	were replayed."""
+	
+	events, offset = read_events(t_data_path, wc.Log_offset)
+	
+	for event in events:
+		apply_event(wc, event)
+	
+	wc.Log_offset = offset
+	if events:
+		wc.Version += 1
+	
+	return len(events)
+
+
+def compact_log(t_data_path, wc):
+	"""Write the model(with every logged event replayed) back into the
+	data file, then drop the replayed events from the log. Events after
+	the replayed offset are kept."""
+	
+	with log_lock(t_data_path):
+		replay_log(wc, t_data_path)
+		
+		tmp_path = t_data_path + ".tmp"
+		with open(tmp_path, "w", encoding="utf-8") as jp:
+			json.dump(wc.to_json(), jp, indent=4, ensure_ascii=False)
+		os.replace(tmp_path, t_data_path)
+		
+		try:
+			with open(log_path(t_data_path), "rb") as lp:
+				lp.seek(wc.Log_offset)
+				tail = lp.read()
+		except OSError:
+			tail = b""
+		
+		tmp_path = log_path(t_data_path) + ".tmp"
+		with open(tmp_path, "wb") as lp:
+			lp.write(tail)
+		os.replace(tmp_path, log_path(t_data_path))
+		wc.Log_offset = 0
+
+
+def merge_log(raw_data, t_data_path):
+	"""Apply every logged event to the raw json data of a tournament,
+	return the offset right after them."""
+	
+	events, offset = read_events(t_data_path)
+	
+	j_matches = {j_match["ID"]: j_match for j_match in raw_data["Matches"]}
+	for event in events:
+		mid = event_mid(event)
+		if mid is None:
+			raw_data["Awards"][event["Award"]] = event["Winner"]
+		elif mid in j_matches:
+			event_match(j_matches[mid], event)
+		else:
+			j_matches[mid] = event_match(None, event)
+			raw_data["Matches"].append(j_matches[mid])
+	
+	return offset
+
+
+class LogWatcher(DataWatcher):
+	"""Watch a data file that may have an event log next to it."""
+	
+	def merge(self, raw_data, wc):
+		"""Return the data file with the whole log applied on top, and
+		remember how far the log was read."""
+		
+		wc.Log_offset = merge_log(raw_data, self.Path)
+		return raw_data
+
+
+if __name__ == "__main__":
+	
+	if len(sys.argv) > 2 and sys.argv[1] == "append":
+		data_path = sys.argv[3] if len(sys.argv) > 3 else "fifa_data.json"
+		append_event(data_path, json.loads(sys.argv[2]))
+	elif len(sys.argv) > 1 and sys.argv[1] == "compact":
+		data_path = sys.argv[2] if len(sys.argv) > 2 else "fifa_data.json"
+		with open(data_path, "rb") as jp:
+			compact_log(data_path, Tournament(json.load(jp)))
+	else:
+		sys.exit("Usage: python3 event_log.py append '<event json>' [data file]\n"
+				 "       python3 event_log.py compact [data file]")
@@ -5,62 +5,168 @@
 # 
 # RUN COMMAND: python3 fwc_explorer.py
 # 
+# THE BUILT DATA MODEL IS CACHED IN A SNAPSHOT FILE NEXT TO THE DATA
+# FILE. USE --rebuild-snapshot TO FORCE A FRESH BUILD OR --no-snapshot
+# TO NEITHER READ NOR WRITE THE SNAPSHOT.
+# 
+# BATCH COMMAND: python3 fwc_explorer.py --batch commands.txt --tz EDT
+# BATCH MODE READS ONE COMMAND PER LINE FROM A FILE(OR STDIN WITH "-")
+# AND WRITES THE RESULTS TO STDOUT, OR TO ONE FILE PER COMMAND WITH
+# --out-dir. EMPTY LINES AND LINES STARTING WITH "#" ARE SKIPPED.
+# WITH --json EACH RESULT IS WRITTEN AS ONE JSON OBJECT INSTEAD. "Help",
+# "Cache" AND "Use" WORK AS IN A SESSION, THE TIME ZONE IS CHANGED WITH
+# "Tzone <zone>" SINCE THERE IS NO PROMPT.
+# 
+# WITH --watch SECONDS THE DATA FILE IS CHECKED FOR CHANGES IN THE
+# BACKGROUND, AND CHANGED MATCHES ARE UPDATED BEFORE THE NEXT COMMAND.
+# 
+# ARCHIVE COMMAND: python3 fwc_explorer.py --archive world_cups/
+# THE ARCHIVE IS A DIRECTORY OR MANIFEST OF DATA FILES, ONE TOURNAMENT
+# EACH. THE LATEST TOURNAMENT IS USED FIRST, "Use <year>" SWITCHES TO
+# ANOTHER ONE AND "Use" LISTS THEM ALL.
+# 
+# DATABASE COMMAND: python3 fwc_explorer.py --db fifa_data.db --year 2018
+# LOADS A TOURNAMENT STORED WITH sql_backend.py INSTEAD OF A DATA FILE.
+# 
+# SERVER COMMAND: python3 fwc_explorer.py --serve 8018 --max-conn 64
+# LOADS THE MODEL ONCE AND ANSWERS MANY CONNECTIONS, SEE query_server.py.
+# 
 
+import argparse
+import asyncio
+import functools
+import io
 import json
-from attrdict import AttrDict
+import os
+import sqlite3
+import sys
 
 from tzone_convert import *
 from command_functions import *
 from special_classes import *
+from data_snapshot import *
+from live_update import *
+from event_log import *
+from tournament_archive import *
+from sql_backend import *
+from query_server import *
+import outcome_sim
 
 # load the help file.
 with open("command_help.txt", "rb") as hp:
 	FULL_TEXT = hp.readlines()
 	help_text = [line for line in FULL_TEXT]
+	help_msg = "".join("{}\n".format(line.strip()) for line in help_text) + "\n"
 
-# load the data file.
-with open("fifa_data.json", "rb") as jp:
-	raw_data = json.load(jp)
-	FULL_DATA = AttrDict(raw_data)
+
+def initialize(raw_data):
+	"""Setup the tournament model(matches, groups, team index) from raw
+	json data. The model does not depend on the time zone, which is only
+	applied when displaying schedules."""
 	
-wc_meta = FULL_DATA.Meta
-wc_matches = FULL_DATA.Matches
-wc_groups = FULL_DATA.Groups
-wc_awards = FULL_DATA.Awards
+	return Tournament(raw_data)
 
 
-def initialize(all_matches, all_groups, parti_teams, wc_matches, wc_groups, user_tz):
-	"""Setup/re-initialize match and group object lists."""
+def load_data(data_path, use_snapshot=True, rebuild=False):
+	"""Load the data file and return the tournament model, restored from
+	the snapshot when it was built from the very same data. Events logged
+	since the model was built are replayed on top of it."""
+	
+	with open(data_path, "rb") as jp:
+		raw = jp.read()
+	
+	if not use_snapshot:
+		wc = initialize(json.loads(raw))
+		replay_log(wc, data_path)
+		return wc
+	
+	key = data_key(data_path, raw)
+	wc = None
+	if not rebuild:
+		wc = read_snapshot(data_path, key)
+	
+	if wc is None:
+		wc = initialize(json.loads(raw))
+		replay_log(wc, data_path)
+		write_snapshot(data_path, key, wc)
+	elif replay_log(wc, data_path):
+		write_snapshot(data_path, key, wc)
 	
-	all_matches.clear()
-	all_groups.clear()
+	return wc
+
+
+def parse_args():
+	"""Read the command line options."""
 	
-	for match in wc_matches:
-		all_matches.append(Match(match, user_tz))
-		pass
+	parser = argparse.ArgumentParser(description="World Cup Explorer")
+	parser.add_argument("--data", default="fifa_data.json",
+						help="path of the tournament data file")
+	parser.add_argument("--rebuild-snapshot", action="store_true",
+						help="rebuild the data snapshot even if it is current")
+	parser.add_argument("--no-snapshot", action="store_true",
+						help="neither read nor write the data snapshot")
+	parser.add_argument("--tz", help="time zone, skips the time zone prompt")
+	parser.add_argument("--batch", metavar="FILE",
+						help="run the commands in FILE(- for stdin) and exit")
+	parser.add_argument("--out-dir",
+						help="write each batch command result to its own file")
+	parser.add_argument("--json", action="store_true",
+						help="write batch results as json objects instead of text")
+	parser.add_argument("--watch", type=float, metavar="SECONDS",
+						help="check the data file for updates every SECONDS")
+	parser.add_argument("--archive", metavar="PATH",
+						help="directory or manifest of several tournament data files")
+	parser.add_argument("--resident", type=int, default=4, metavar="N",
+						help="keep at most N archive tournaments in memory")
+	parser.add_argument("--db", metavar="PATH",
+						help="load the tournament from a sqlite database instead")
+	parser.add_argument("--year",
+						help="tournament to load from the database(the latest by default)")
+	parser.add_argument("--serve", type=int, metavar="PORT",
+						help="answer commands over TCP/HTTP on PORT instead of the terminal")
+	parser.add_argument("--host", default="127.0.0.1",
+						help="address the server listens on")
+	parser.add_argument("--max-conn", type=int, default=64, metavar="N",
+						help="serve at most N connections at once")
+	parser.add_argument("--workers", type=int, default=1, metavar="N",
+						help="worker processes for Predict and the History tables")
+	return parser.parse_args()
 
-	for group in wc_groups:
-		all_groups.append(Group(group, wc_matches, user_tz))
-		for gt in group.Teams:
-			parti_teams.append(gt.title())
-		pass
 
+def use_command(u_command, wc, archive):
+	"""Switch to another tournament of the archive("Use <year>") or list
+	them("Use"). Return the model in use, the error code and the output
+	text."""
+	
+	if archive is None:
+		return wc, 1, "\nOnly one tournament is loaded, start with --archive to use others.\n\n"
+	
+	command_list = u_command.split()
+	out = io.StringIO()
+	
+	if len(command_list) == 1:
+		archive.display_years(out)
+	elif len(command_list) == 2 and archive.use(command_list[1]):
+		wc = archive.current()
+		print("\nNow browsing the {} {} World Cup.\n".format(wc.Year, wc.Host), file=out)
+	else:
+		return wc, 2, handle_error(2)
+	
+	return wc, 0, out.getvalue()
 
-def run_explorer(wc_meta, wc_matches, wc_groups, wc_awards):
+
+def run_explorer(wc, user_tz=None, watcher=None, archive=None):
 	"""Display the welcome message and start a browsing session."""
 	
-	all_matches = []
-	all_groups = []
-	parti_teams = []
-	parti_groups = ["A", "B", "C", "D", "E", "F", "G", "H"]
-	
 	welcome_msg = "\nWelcome to the {} {} World Cup Explorer."
-	welcome_msg = welcome_msg.format(wc_meta.Year, wc_meta.Host)
+	welcome_msg = welcome_msg.format(wc.Year, wc.Host)
 	print(welcome_msg)
 	
 	# time zone setup.
-	user_tz = tz_setup().upper()
-	initialize(all_matches, all_groups, parti_teams, wc_matches, wc_groups, user_tz)
+	if user_tz is None:
+		user_tz = tz_setup().upper()
+	
+	r_cache = CommandCache()
 	
 	print("\nPlease enter a command to browse data.")
 	print("Read command_help.txt for instructions or enter Help.")
@@ -69,25 +175,152 @@ def run_explorer(wc_meta, wc_matches, wc_groups, wc_awards):
 	while True:
 		u_command = input("\n$ ")
 		
+		if watcher is not None:
+			changed = watcher.sync(wc)
+			if changed:
+				print("\n({} updates loaded from the data file)".format(len(changed)))
+		
 		if u_command.title() == "Quit":
 			print("\nThank you for using the explorer, welcome back any time.\n\n")
 			break
 		elif u_command.title() == "Help":
-			for line in help_text:
-				print(line.strip())
-			else:
-				print("")
-				continue
+			sys.stdout.write(help_msg)
+			continue
 		elif u_command.title() == "Tzone":
 			user_tz = tz_setup().upper()
-			initialize(all_matches, all_groups, parti_teams, wc_matches, wc_groups, user_tz)
+		elif u_command.title() == "Cache":
+			sys.stdout.write(r_cache.stats())
+		elif u_command.title().split(" ")[0] == "Use":
+			wc, error_code, r_text = use_command(u_command, wc, archive)
+			sys.stdout.write(r_text)
 		else:
-			error_code = read_command(u_command, all_matches, all_groups,
-									  parti_teams, parti_groups, wc_awards)
+			error_code, r_text = r_cache.run(u_command, wc, user_tz, archive)
 			# print("\n{}\n".format(error_code))
-			handle_error(error_code)
+			sys.stdout.write(r_text + handle_error(error_code))
 			continue
 
 
+def run_batch(wc, commands, user_tz, out_dir=None, archive=None, as_json=False):
+	"""Run commands without prompting against one loaded model, return
+	the number of commands that failed. As json, each result is one
+	object per line(see command_results.py)."""
+	
+	failed = 0
+	r_cache = CommandCache()
+	
+	if out_dir is not None:
+		os.makedirs(out_dir, exist_ok=True)
+	
+	for cn, u_command in enumerate(commands, 1):
+		u_command = u_command.strip()
+		if not u_command or u_command.startswith("#"):
+			continue
+		elif u_command.title() == "Quit":
+			break
+		
+		command_list = u_command.split()
+		keyword = command_list[0].title()
+		result = None
+		if keyword == "Use":
+			wc, error_code, r_text = use_command(u_command, wc, archive)
+			if not error_code:
+				result = {"year": wc.Year, "host": wc.Host, "years": archive.years()}
+		elif u_command.title() == "Help":
+			error_code, r_text, result = 0, help_msg, {"help": help_msg}
+		elif u_command.title() == "Cache":
+			error_code, r_text = 0, r_cache.stats()
+			result = {"entries": len(r_cache.Entries), "hits": r_cache.Hits,
+					  "misses": r_cache.Misses}
+		elif keyword == "Tzone":
+			# no prompt in batch mode, the zone must be given.
+			new_tz = tz_valid(command_list[1]) if len(command_list) == 2 else None
+			if new_tz is None:
+				error_code, r_text = 1, handle_error(1)
+			else:
+				user_tz = new_tz.upper()
+				error_code, r_text = 0, "\n{} is now your time zone.\n\n".format(user_tz)
+				result = {"tzone": user_tz}
+		elif as_json:
+			error_code, result = r_cache.run(u_command, wc, user_tz, archive, True)
+		else:
+			error_code, r_text = r_cache.run(u_command, wc, user_tz, archive)
+			r_text += handle_error(error_code)
+		
+		if as_json:
+			r_text = json.dumps({"command": u_command, "error": error_code,
+								 "result": result}, ensure_ascii=False) + "\n"
+		
+		if out_dir is None and as_json:
+			sys.stdout.write(r_text)
+		elif out_dir is None:
+			sys.stdout.write("\n$ {}\n{}".format(u_command, r_text))
+		else:
+			out_path = os.path.join(out_dir, "{:06}.{}".format(cn, "json" if as_json else "txt"))
+			with open(out_path, "w") as op:
+				op.write(r_text)
+		
+		if error_code:
+			failed += 1
+	
+	return failed
+
+
 if __name__ == "__main__":
-	run_explorer(wc_meta, wc_matches, wc_groups, wc_awards)
+	args = parse_args()
+	outcome_sim.WORKERS = max(1, args.workers)
+	
+	user_tz = None
+	if args.tz is not None:
+		user_tz = tz_valid(args.tz)
+		if user_tz is None:
+			sys.exit("Invalid time zone: {}".format(args.tz))
+		user_tz = user_tz.upper()
+	
+	archive = None
+	if args.archive is not None:
+		if args.watch is not None:
+			sys.exit("--watch needs a single data file, not an archive")
+		archive = TournamentArchive(args.archive,
+									functools.partial(load_data, use_snapshot=not args.no_snapshot,
+													  rebuild=args.rebuild_snapshot),
+									args.resident, args.workers)
+		wc = archive.current()
+	elif args.db is not None:
+		if args.watch is not None:
+			sys.exit("--watch needs a single data file, not a database")
+		try:
+			db_conn = connect(args.db)
+			years = stored_years(db_conn)
+		except (OSError, sqlite3.Error):
+			sys.exit("Not a tournament database: {}".format(args.db))
+		if not years or (args.year is not None and args.year not in years):
+			sys.exit("Tournament not found in {}".format(args.db))
+		wc = load_tournament(db_conn, args.year or years[-1])
+	else:
+		wc = load_data(args.data, not args.no_snapshot, args.rebuild_snapshot)
+	
+	if args.serve is not None:
+		watcher = None
+		if args.watch is not None:
+			watcher = LogWatcher(args.data, args.watch)
+			watcher.start()
+		try:
+			asyncio.run(serve(wc, args.host, args.serve, args.max_conn, watcher, archive,
+							  help_msg))
+		except KeyboardInterrupt:
+			pass
+	elif args.batch is None:
+		watcher = None
+		if args.watch is not None:
+			watcher = LogWatcher(args.data, args.watch)
+			watcher.start()
+		run_explorer(wc, user_tz, watcher, archive)
+	else:
+		if user_tz is None:
+			user_tz = "UTC"
+		if args.batch == "-":
+			failed = run_batch(wc, sys.stdin, user_tz, args.out_dir, archive, args.json)
+		else:
+			with open(args.batch) as bp:
+				failed = run_batch(wc, bp, user_tz, args.out_dir, archive, args.json)
+		sys.exit(1 if failed else 0)
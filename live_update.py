@@ -0,0 +1,160 @@
+# live_update.py #
+# =====================================================================
+# DEFINE A WATCHER THAT KEEPS A RUNNING SESSION IN SYNC WITH THE DATA
+# FILE WHILE A TOURNAMENT IS BEING PLAYED.
+# 
+# A BACKGROUND THREAD POLLS THE DATA FILE AND PARSES IT WHEN ITS SIZE
+# OR MODIFICATION TIME CHANGES. THE SESSION THEN CALLS sync() BETWEEN
+# COMMANDS, WHICH COMPARES THE NEW DATA WITH THE LOADED MODEL BY MATCH
+# ID AND GOAL LIST AND ONLY UPDATES THE MATCHES THAT CHANGED. THE MODEL
+# IS THEREFORE NEVER CHANGED WHILE A COMMAND IS RUNNING. SUBCLASSES MAY
+# merge() MORE UPDATES INTO THE NEW DATA BEFORE IT IS COMPARED(SEE
+# LogWatcher IN event_log.py).
+# 
+
+import json
+import os
+import threading
+
+from special_classes import *
+
+
+def match_changed(match, j_match):
+	"""Tell if the raw json data of a match differs from the Match."""
+	
+	ids = match.Symbols.IDs
+	
+	if (match.Finished != j_match["Finished"]
+			or match.Teams != tuple(ids.get(t, -1) for t in j_match["Teams"])
+			or match.Winner != ids.get(j_match["Winner"], -1)
+			or match.Stadium != ids.get(j_match["Stadium"], -1)
+			or match.Man_of_the_Match != ids.get(j_match["Man_of_the_Match"], -1)
+			or len(match.Goals) != len(j_match["Goals"])):
+		return True
+	
+	for goal, j_goal in zip(match.Goals, j_match["Goals"]):
+		if (goal.Type != j_goal["Type"] or goal.When != j_goal["When"]
+				or goal.Team != ids.get(j_goal["Team"], -1)
+				or goal.Player != ids.get(j_goal["Player"], -1)):
+			return True
+	
+	return False
+
+
+def apply_match(wc, j_match):
+	"""Add a new match to the model or update an existing one from its
+	raw json data, then refresh the team index and group standings for
+	that match alone. Return False if nothing changed."""
+	
+	match = wc.Registry.get(j_match["ID"])
+	
+	if match is None:
+		match = Match(j_match, wc.Year, wc.Symbols)
+		wc.Matches.append(match)
+		wc.Matches.sort(key=lambda i: i.Index)
+		wc.Registry[match.ID] = match
+		for group in wc.Groups:
+			if match.ID in group.MIDs:
+				group.Matches.append(match)
+		old_teams = ()
+	elif match_changed(match, j_match):
+		old_teams = match.Teams
+		match.read_progress(j_match)
+	else:
+		return False
+	
+	wc.Index.refresh(match, old_teams)
+	for group in wc.Groups:
+		if group.ID == match.Group and match in group.Matches:
+			group.Standings.update_match(match)
+	wc.Leaderboard.update_match(match)
+	
+	return True
+
+
+def apply_changes(wc, raw_data):
+	"""Update the matches(and awards) of the model that differ from the
+	raw json data, return the IDs of the changed matches."""
+	
+	changed = []
+	
+	for j_match in raw_data["Matches"]:
+		if apply_match(wc, j_match):
+			changed.append(j_match["ID"])
+	
+	if raw_data["Awards"] != wc.Awards:
+		wc.Awards.clear()
+		wc.Awards.update(raw_data["Awards"])
+		changed.append("Awards")
+	
+	if changed:
+		wc.Version += 1
+	
+	return changed
+
+
+class DataWatcher(threading.Thread):
+	"""Poll the data file and keep its latest parsed content."""
+	
+	def __init__(self, data_path, interval=5.0):
+		
+		threading.Thread.__init__(self, daemon=True)
+		self.Path = data_path
+		self.Interval = interval
+		self.Signature = self.stat()
+		self.Pending = None
+		self.Lock = threading.Lock()
+		self.Stopped = threading.Event()
+	
+	def stat(self):
+		"""Return the size and modification time of the data file."""
+		
+		try:
+			st = os.stat(self.Path)
+		except OSError:
+			return None
+		return (st.st_size, st.st_mtime_ns)
+	
+	def run(self):
+		
+		while not self.Stopped.wait(self.Interval):
+			self.poll()
+	
+	def poll(self):
+		"""Parse the data file again if it changed since the last poll."""
+		
+		sig = self.stat()
+		if sig is None or sig == self.Signature:
+			return
+		
+		try:
+			with open(self.Path, "rb") as jp:
+				raw_data = json.load(jp)
+		except (OSError, ValueError):
+			# the feed may be halfway through rewriting the file.
+			return
+		
+		with self.Lock:
+			self.Pending = raw_data
+		self.Signature = sig
+	
+	def sync(self, wc):
+		"""Apply the latest parsed data to the model, return the IDs of
+		the changed matches."""
+		
+		with self.Lock:
+			raw_data = self.Pending
+			self.Pending = None
+		
+		if raw_data is None:
+			return []
+		return apply_changes(wc, self.merge(raw_data, wc))
+	
+	def merge(self, raw_data, wc):
+		"""Return the data the model should match, the data file as is."""
+		
+		return raw_data
+	
+	def stop(self):
+		
+		self.Stopped.set()
@@ -0,0 +1,394 @@
+# outcome_sim.py #
+# =====================================================================
+# DEFINE A MONTE CARLO SIMULATION OF THE REST OF THE TOURNAMENT, WHICH
+# PLAYS EVERY UNFINISHED MATCH MANY TIMES OVER AND COUNTS HOW OFTEN EACH
+# TEAM REACHES EACH KNOCKOUT ROUND AND WINS THE TITLE.
+# 
+# GOALS ARE DRAWN FROM POISSON DISTRIBUTIONS. A TEAM'S EXPECTED GOALS
+# AGAINST AN OPPONENT ARE ITS ATTACK RATE TIMES THE OPPONENT'S DEFENCE
+# RATE OVER THE AVERAGE RATE, ALL TAKEN FROM THE FINISHED MATCHES.
+# 
+# GROUPS ARE RANKED BY POINTS, GOAL DIFFERENCE AND GOALS SCORED(TIES BY
+# LOT), THEIR TEAMS ARE PLACED IN THE FIRST KNOCKOUT ROUND BY THE MATCH
+# "Slots"(e.g. ["A1", "B2"]) AND LATER ROUNDS FOLLOW THE BRACKET
+# FEEDERS. A SLOT "Best N" TAKES THE N-TH BEST TEAM OF THOSE PLACED 3RD
+# OR LOWER OVER ALL GROUPS, RANKED BY PLACE AND THEN LIKE A GROUP. DRAWN
+# KNOCKOUT MATCHES GO TO EXTRA TIME AND THEN PENALTIES, WHICH ARE A COIN
+# FLIP.
+# 
+# WITH NUMPY ALL RUNS OF A MATCH ARE DRAWN AT ONCE, WITHOUT IT EACH RUN
+# IS PLAYED WITH ORDINARY LOOPS. RUNS ARE SPLIT INTO CHUNKS OF FIXED
+# SIZE WITH THEIR OWN SEED, SO THE RESULT FOR A SEED DOES NOT DEPEND ON
+# HOW MANY WORKER PROCESSES SHARE THE CHUNKS.
+# 
+
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from special_classes import *
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# runs of one chunk, each chunk is one task for a worker.
+CHUNK = 10000
+# goals per team and match when nothing has been played yet.
+DEFAULT_RATE = 1.3
+# rates are blended with the average as if each team had played this
+# many average matches more.
+PRIOR_MATCHES = 4
+# extra time is a third of a match.
+EXTRA_TIME = 1 / 3
+# worker processes used by the Predict command, set by --workers.
+WORKERS = 1
+# most runs the Predict command accepts.
+RUN_LIMIT = 1000000
+
+
+class SimPlan:
+	"""Hold what the runs need from the model as plain numbers, so it
+	can be sent to worker processes. Teams are numbered by position."""
+	
+	__slots__ = ("Names", "Attack", "Defence", "Average", "Groups", "Knockout",
+				 "Rounds", "Final", "Best")
+	
+	def __init__(self, wc):
+		"""Groups are (team numbers, [Pts, GD, GF] rows so far, unfinished
+		matches as pairs of positions in the group). Knockout matches are
+		(round, two team sources, fixed winner or None) in Index order,
+		where a source is ("team", number), ("place", group, place),
+		("best", rank), ("winner", knockout match) or None if nobody can be
+		found. Best is how many "best" ranks the runs need."""
+		
+		teams = [team for group in wc.Groups for team in group.Teams if team != NO_NAME]
+		number = {team: n for n, team in enumerate(teams)}
+		self.Names = [wc.Symbols.name(team) for team in teams]
+		
+		# [MP, W, D, L, GF, GD, Pts] of each team so far.
+		t_rows = [wc.prefix().team_row(team) for team in teams]
+		played = [row[0] for row in t_rows]
+		scored = [(row[4], row[4] - row[5]) for row in t_rows]
+		if sum(played):
+			self.Average = sum(gf for gf, ga in scored) / sum(played) or DEFAULT_RATE
+		else:
+			self.Average = DEFAULT_RATE
+		
+		prior = self.Average * PRIOR_MATCHES
+		self.Attack = [(gf + prior) / (mp + PRIOR_MATCHES)
+					   for (gf, ga), mp in zip(scored, played)]
+		self.Defence = [(ga + prior) / (mp + PRIOR_MATCHES)
+						for (gf, ga), mp in zip(scored, played)]
+		
+		self.Groups = []
+		group_pos = {}
+		group_open = []
+		for group in wc.Groups:
+			g_teams = [team for team in group.Teams if team != NO_NAME]
+			pos = {team: n for n, team in enumerate(g_teams)}
+			rows = [[group.Standings.Rows[team][6], group.Standings.Rows[team][5],
+					 group.Standings.Rows[team][4]] for team in g_teams]
+			matches = [(pos[match.T0], pos[match.T1]) for match in group.Matches
+					   if not match.Finished and match.T0 in pos and match.T1 in pos]
+			group_pos[group.ID] = len(self.Groups)
+			group_open.append(bool(matches))
+			self.Groups.append(([number[team] for team in g_teams], rows, matches))
+		
+		bracket = wc.bracket()
+		self.Rounds = list(bracket.Rounds)
+		self.Knockout = []
+		self.Final = None
+		self.Best = 0
+		if bracket.Root is None:
+			return
+		
+		# without slots, the winner of one group meets the runner-up of
+		# the next one(A1-B2, B1-A2, C1-D2, ...).
+		g_ids = [group.ID for group in wc.Groups]
+		pairing = []
+		for n in range(0, len(g_ids) - 1, 2):
+			pairing.append((g_ids[n] + "1", g_ids[n + 1] + "2"))
+			pairing.append((g_ids[n + 1] + "1", g_ids[n] + "2"))
+		
+		k_pos = {}
+		nodes = sorted(bracket.Nodes.values(), key=lambda n: n[0].Index)
+		first = [match for match, feeders in nodes if match.Type == self.Rounds[0]]
+		for match, feeders in nodes:
+			sources = []
+			for n, team in enumerate(match.Teams[:2]):
+				source = ("team", number[team]) if team in number else None
+				if match.Finished:
+					pass
+				elif match.Type == self.Rounds[0]:
+					if len(match.Slots) > n:
+						slot = match.Slots[n]
+					elif first.index(match) < len(pairing):
+						slot = pairing[first.index(match)][n]
+					else:
+						slot = None
+					if slot is not None and slot.startswith("Best "):
+						if source is None or any(group_open):
+							source = ("best", int(slot[5:]) - 1)
+							self.Best = max(self.Best, source[1] + 1)
+					elif slot is not None and slot[:-1] in group_pos:
+						g_n = group_pos[slot[:-1]]
+						if source is None or group_open[g_n]:
+							source = ("place", g_n, int(slot[-1]) - 1)
+				elif n < len(feeders):
+					source = ("winner", k_pos[feeders[n]])
+				sources.append(source)
+			
+			fixed = None
+			if match.Finished and match.Winner in number:
+				fixed = number[match.Winner]
+			k_pos[match.ID] = len(self.Knockout)
+			self.Knockout.append((self.Rounds.index(match.Type), sources, fixed))
+		
+		self.Final = k_pos[bracket.Root.ID]
+
+
+class Prediction:
+	"""Hold how many runs each team reached each knockout round and won
+	the title in."""
+	
+	__slots__ = ("Runs", "Unfinished", "Rounds", "Names", "Reach", "Champion")
+	
+	def __init__(self, plan, runs, unfinished, reach, champion):
+		
+		self.Runs = runs
+		self.Unfinished = unfinished
+		self.Rounds = plan.Rounds
+		self.Names = plan.Names
+		self.Reach = reach
+		self.Champion = champion
+	
+	def rows(self):
+		"""Return (team, [chance of reaching each round], chance of the
+		title) from the likeliest champion down."""
+		
+		t_rows = []
+		for n, name in enumerate(self.Names):
+			chances = [r_counts[n] / self.Runs for r_counts in self.Reach]
+			t_rows.append((name, chances, self.Champion[n] / self.Runs))
+		
+		return sorted(t_rows, key=lambda r: ([-r[2]] + [-c for c in reversed(r[1])], r[0]))
+
+
+def poisson(rng, lam):
+	"""Draw from a Poisson distribution(Knuth's method, fine for the few
+	goals of a match)."""
+	
+	limit = math.exp(-lam)
+	k = 0
+	p = rng.random()
+	while p > limit:
+		k += 1
+		p *= rng.random()
+	return k
+
+
+def run_chunk(plan, runs, seed, chunk):
+	"""Play one chunk of runs, return the reach counts of every round and
+	the title counts, per team."""
+	
+	if np is not None:
+		return run_numpy(plan, runs, seed, chunk)
+	return run_python(plan, runs, seed, chunk)
+
+
+def run_numpy(plan, runs, seed, chunk):
+	"""Play every run of a chunk at once, one match at a time."""
+	
+	rng = np.random.default_rng([seed, chunk])
+	attack = np.array(plan.Attack) / plan.Average
+	defence = np.array(plan.Defence)
+	size = len(plan.Names)
+	
+	places = []
+	extras = []
+	for g_teams, rows, matches in plan.Groups:
+		g_teams = np.array(g_teams)
+		table = np.tile(np.array(rows, dtype=np.int64).reshape(1, -1, 3), (runs, 1, 1))
+		for i, j in matches:
+			g_i = rng.poisson(attack[g_teams[i]] * defence[g_teams[j]], runs)
+			g_j = rng.poisson(attack[g_teams[j]] * defence[g_teams[i]], runs)
+			table[:, i, 0] += np.where(g_i > g_j, 3, np.where(g_i == g_j, 1, 0))
+			table[:, j, 0] += np.where(g_j > g_i, 3, np.where(g_i == g_j, 1, 0))
+			table[:, i, 1] += g_i - g_j
+			table[:, j, 1] += g_j - g_i
+			table[:, i, 2] += g_i
+			table[:, j, 2] += g_j
+		order = np.lexsort((rng.random((runs, len(g_teams))), -table[:, :, 2],
+							-table[:, :, 1], -table[:, :, 0]), axis=-1)
+		places.append(g_teams[order])
+		if plan.Best:
+			for p in range(2, len(g_teams)):
+				row = table[np.arange(runs), order[:, p]]
+				extras.append((np.full(runs, p), row, g_teams[order[:, p]]))
+	
+	if extras:
+		# the teams placed 3rd or lower, best first in every run.
+		keys = [np.stack([extra[1][:, c] for extra in extras], axis=1) for c in range(3)]
+		ranked = np.lexsort((rng.random((runs, len(extras))), -keys[2], -keys[1], -keys[0],
+							 np.stack([extra[0] for extra in extras], axis=1)), axis=-1)
+		best = np.take_along_axis(np.stack([extra[2] for extra in extras], axis=1),
+								  ranked, axis=1)
+	
+	reach = np.zeros((len(plan.Rounds), size), dtype=np.int64)
+	winners = []
+	for r, sources, fixed in plan.Knockout:
+		sides = []
+		for source in sources:
+			if source is None:
+				side = np.full(runs, -1)
+			elif source[0] == "team":
+				side = np.full(runs, source[1])
+			elif source[0] == "place":
+				g_places = places[source[1]]
+				if source[2] < g_places.shape[1]:
+					side = g_places[:, source[2]]
+				else:
+					side = np.full(runs, -1)
+			elif source[0] == "best":
+				if source[1] < len(extras):
+					side = best[:, source[1]]
+				else:
+					side = np.full(runs, -1)
+			else:
+				side = winners[source[1]]
+			reach[r] += np.bincount(side[side >= 0], minlength=size)
+			sides.append(side)
+		
+		if fixed is not None:
+			winners.append(np.full(runs, fixed))
+			continue
+		
+		a, b = sides
+		a_n = np.maximum(a, 0)
+		b_n = np.maximum(b, 0)
+		lam_a = attack[a_n] * defence[b_n]
+		lam_b = attack[b_n] * defence[a_n]
+		g_a = rng.poisson(lam_a)
+		g_b = rng.poisson(lam_b)
+		tie = g_a == g_b
+		g_a = g_a + np.where(tie, rng.poisson(lam_a * EXTRA_TIME), 0)
+		g_b = g_b + np.where(tie, rng.poisson(lam_b * EXTRA_TIME), 0)
+		a_wins = (g_a > g_b) | ((g_a == g_b) & (rng.random(runs) < 0.5))
+		winner = np.where(a_wins, a, b)
+		winners.append(np.where(a < 0, b, np.where(b < 0, a, winner)))
+	
+	champion = np.zeros(size, dtype=np.int64)
+	if plan.Final is not None:
+		final = winners[plan.Final]
+		champion = np.bincount(final[final >= 0], minlength=size)
+	
+	return reach.tolist(), champion.tolist()
+
+
+def run_python(plan, runs, seed, chunk):
+	"""Play the runs of a chunk one after another."""
+	
+	rng = random.Random(seed * 1000003 + chunk)
+	attack = [rate / plan.Average for rate in plan.Attack]
+	defence = plan.Defence
+	size = len(plan.Names)
+	
+	reach = [[0] * size for r_type in plan.Rounds]
+	champion = [0] * size
+	for run in range(runs):
+		places = []
+		extras = []
+		for g_teams, rows, matches in plan.Groups:
+			table = [list(row) for row in rows]
+			for i, j in matches:
+				g_i = poisson(rng, attack[g_teams[i]] * defence[g_teams[j]])
+				g_j = poisson(rng, attack[g_teams[j]] * defence[g_teams[i]])
+				table[i][0] += 3 if g_i > g_j else 1 if g_i == g_j else 0
+				table[j][0] += 3 if g_j > g_i else 1 if g_i == g_j else 0
+				table[i][1] += g_i - g_j
+				table[j][1] += g_j - g_i
+				table[i][2] += g_i
+				table[j][2] += g_j
+			lots = [rng.random() for team in g_teams]
+			order = sorted(range(len(g_teams)), key=lambda n: (-table[n][0], -table[n][1],
+															   -table[n][2], lots[n]))
+			places.append([g_teams[n] for n in order])
+			if plan.Best:
+				extras.extend((p, -table[n][0], -table[n][1], -table[n][2], rng.random(),
+							   g_teams[n]) for p, n in enumerate(order) if p >= 2)
+		extras.sort()
+		
+		winners = []
+		for r, sources, fixed in plan.Knockout:
+			sides = []
+			for source in sources:
+				if source is None:
+					side = -1
+				elif source[0] == "team":
+					side = source[1]
+				elif source[0] == "place":
+					g_places = places[source[1]]
+					side = g_places[source[2]] if source[2] < len(g_places) else -1
+				elif source[0] == "best":
+					side = extras[source[1]][-1] if source[1] < len(extras) else -1
+				else:
+					side = winners[source[1]]
+				if side >= 0:
+					reach[r][side] += 1
+				sides.append(side)
+			
+			a, b = sides
+			if fixed is not None:
+				winners.append(fixed)
+			elif a < 0 or b < 0:
+				winners.append(max(a, b))
+			else:
+				lam_a = attack[a] * defence[b]
+				lam_b = attack[b] * defence[a]
+				g_a = poisson(rng, lam_a)
+				g_b = poisson(rng, lam_b)
+				if g_a == g_b:
+					g_a += poisson(rng, lam_a * EXTRA_TIME)
+					g_b += poisson(rng, lam_b * EXTRA_TIME)
+				if g_a == g_b:
+					winners.append(a if rng.random() < 0.5 else b)
+				else:
+					winners.append(a if g_a > g_b else b)
+		
+		if plan.Final is not None and winners[plan.Final] >= 0:
+			champion[winners[plan.Final]] += 1
+	
+	return reach, champion
+
+
+def predict(wc, runs=10000, workers=None, seed=0):
+	"""Simulate the rest of the tournament runs times, with the chunks
+	spread over worker processes if more than one is asked for."""
+	
+	if workers is None:
+		workers = WORKERS
+	
+	plan = SimPlan(wc)
+	sizes = [min(CHUNK, runs - start) for start in range(0, runs, CHUNK)]
+	
+	if workers > 1 and len(sizes) > 1:
+		with ProcessPoolExecutor(min(workers, len(sizes))) as pool:
+			parts = list(pool.map(run_chunk, repeat(plan), sizes, repeat(seed),
+								  range(len(sizes))))
+	else:
+		parts = [run_chunk(plan, size, seed, n) for n, size in enumerate(sizes)]
+	
+	reach = [[0] * len(plan.Names) for r_type in plan.Rounds]
+	champion = [0] * len(plan.Names)
+	for p_reach, p_champion in parts:
+		for r_counts, p_counts in zip(reach, p_reach):
+			for n, count in enumerate(p_counts):
+				r_counts[n] += count
+		for n, count in enumerate(p_champion):
+			champion[n] += count
+	
+	unfinished = sum(1 for match in wc.Matches if not match.Finished)
+	return Prediction(plan, runs, unfinished, reach, champion)
@@ -0,0 +1,229 @@
+# query_server.py #
+# =====================================================================
+# DEFINE A SERVER MODE THAT LOADS THE MODEL ONCE AND ANSWERS COMMANDS
+# FROM MANY CONNECTIONS AT THE SAME TIME.
+# 
+# EACH CONNECTION IS A SESSION WITH ITS OWN TIME ZONE, OUTPUT FORMAT
+# AND(IN ARCHIVE MODE) TOURNAMENT. SESSIONS SEND ONE COMMAND PER LINE,
+# AS IN THE INTERACTIVE PROGRAM, AND THESE EXTRA ONES:
+# 
+# "Tzone <zone>"         SET THE TIME ZONE OF THE SESSION(UTC BY DEFAULT).
+# "Format Text|Json"     ANSWER IN TEXT OR ONE JSON OBJECT PER LINE,
+#                        {"command": ..., "error": ..., "result": ...},
+#                        WITH THE RESULTS OF command_results.py.
+# "Use <year>"           SWITCH TOURNAMENT(ARCHIVE MODE ONLY).
+# 
+# A PLAIN HTTP REQUEST IS ANSWERED TOO, e.g.
+# GET /?q=Team+Spain&tz=EDT&format=json
+# 
+# COMMANDS RUN IN A WORKER THREAD ONE AT A TIME(BEHIND A LOCK), SO THE
+# SHARED MODEL IS NEVER READ WHILE IT IS BEING UPDATED. THE EVENT LOOP
+# STILL ACCEPTS CONNECTIONS AND READS THEIR COMMANDS WHILE A LONG
+# COMMAND(e.g. Predict, History OR LOADING AN ARCHIVE TOURNAMENT) RUNS,
+# BUT THOSE COMMANDS WAIT FOR IT TO FINISH. Predict IS LIMITED TO
+# MAX_RUNS RUNS. A COMMAND THAT FAILS IS ANSWERED WITH AN ERROR AND ITS
+# TRACEBACK IS PRINTED TO stderr. CONNECTIONS BEYOND THE LIMIT ARE
+# TURNED AWAY.
+# 
+
+import asyncio
+import json
+import sys
+import traceback
+from urllib.parse import parse_qs, urlsplit
+
+from tzone_convert import *
+from command_functions import *
+
+# most runs a client may ask Predict for.
+MAX_RUNS = 100000
+# error code of a command that failed while it ran.
+FAILED = 3
+
+
+class QueryServer:
+	"""Serve commands against one shared model."""
+	
+	__slots__ = ("Model", "Archive", "Watcher", "Cache", "Slots", "Help", "Lock")
+	
+	def __init__(self, wc, max_conn=64, watcher=None, archive=None, help_msg=""):
+		
+		self.Model = wc
+		self.Archive = archive
+		self.Watcher = watcher
+		self.Cache = CommandCache()
+		self.Slots = asyncio.Semaphore(max_conn)
+		self.Help = help_msg
+		self.Lock = asyncio.Lock()
+	
+	def answer(self, session, u_command):
+		"""Run one command for a session, return the error code and the
+		output text, or the structured result in JSON format."""
+		
+		command_list = u_command.split()
+		keyword = command_list[0].title() if command_list else ""
+		split = split_command(u_command)
+		
+		if self.Watcher is not None:
+			self.Watcher.sync(self.Model)
+		
+		if keyword == "Help":
+			return self.local(session, 0, self.Help, {"help": self.Help})
+		elif keyword == "Tzone" and len(command_list) == 2:
+			user_tz = tz_valid(command_list[1])
+			if user_tz is None:
+				return self.local(session, 1)
+			session["tz"] = user_tz.upper()
+			return self.local(session, 0,
+							  "\n{} is now your time zone.\n\n".format(session["tz"]),
+							  {"tzone": session["tz"]})
+		elif keyword == "Format" and len(command_list) == 2:
+			if command_list[1].lower() not in ("text", "json"):
+				return self.local(session, 1)
+			session["format"] = command_list[1].lower()
+			return self.local(session, 0, "", {"format": session["format"]})
+		elif (split is not None and split[0][0] == "Predict" and len(split[0]) == 2
+				and split[0][1].isdigit() and int(split[0][1]) > MAX_RUNS):
+			return self.local(session, 1)
+		elif keyword == "Use" and len(command_list) == 2:
+			if self.Archive is None or command_list[1] not in self.Archive.Paths:
+				return self.local(session, 2)
+			session["year"] = command_list[1]
+			wc = self.model(session)
+			return self.local(session, 0,
+							  "\nNow browsing the {} {} World Cup.\n\n".format(wc.Year, wc.Host),
+							  {"year": wc.Year, "host": wc.Host})
+		
+		structured = session["format"] == "json"
+		error_code, result = self.Cache.run(u_command, self.model(session), session["tz"],
+											self.Archive, structured)
+		if structured:
+			return error_code, result
+		return error_code, result + handle_error(error_code)
+	
+	async def run(self, session, u_command):
+		"""Answer a command in a worker thread, one command at a time. A
+		command that raises is answered with the FAILED error code and its
+		traceback is printed."""
+		
+		async with self.Lock:
+			try:
+				return await asyncio.get_running_loop().run_in_executor(
+					None, self.answer, session, u_command)
+			except Exception:
+				print("\nCommand failed: {}".format(u_command), file=sys.stderr)
+				traceback.print_exc()
+				return self.local(session, FAILED)
+	
+	def local(self, session, error_code, r_text="", result=None):
+		"""Return the answer to a server command in the session's format."""
+		
+		if session["format"] == "json":
+			return error_code, result if not error_code else None
+		return error_code, r_text + handle_error(error_code)
+	
+	def model(self, session):
+		"""Return the model a session is browsing."""
+		
+		if session.get("year") is None:
+			return self.Model
+		return self.Archive.get(session["year"])
+	
+	def reply(self, session, u_command, error_code, output):
+		"""Format an answer for the session."""
+		
+		if session["format"] == "json":
+			return json.dumps({"command": u_command, "error": error_code,
+							   "result": output}, ensure_ascii=False) + "\n"
+		return output
+	
+	async def handle(self, reader, writer):
+		"""Run one connection, either a session or an HTTP request."""
+		
+		if self.Slots.locked():
+			writer.write(b"Server busy, try again later.\n")
+			await writer.drain()
+			writer.close()
+			return
+		
+		async with self.Slots:
+			try:
+				first = await reader.readline()
+				if first.startswith(b"GET "):
+					await self.handle_http(first, reader, writer)
+				else:
+					await self.handle_session(first, reader, writer)
+			except (ConnectionError, asyncio.IncompleteReadError):
+				pass
+			finally:
+				writer.close()
+	
+	async def handle_session(self, line, reader, writer):
+		"""Answer commands line by line until Quit or the end of input."""
+		
+		session = {"tz": "UTC", "format": "text", "year": None}
+		
+		while line:
+			u_command = line.decode("utf-8", "replace").strip()
+			if u_command.title() == "Quit":
+				break
+			if u_command:
+				error_code, output = await self.run(session, u_command)
+				reply = self.reply(session, u_command, error_code, output)
+				if session["format"] == "text":
+					reply += "$ "
+				writer.write(reply.encode("utf-8"))
+				await writer.drain()
+			line = await reader.readline()
+	
+	async def handle_http(self, first, reader, writer):
+		"""Answer one GET request with ?q=<command>&tz=<zone>&format=..."""
+		
+		while (await reader.readline()).strip():
+			pass
+		
+		request = first.split()
+		status = "200 OK"
+		if len(request) < 2:
+			status = "400 Bad Request"
+			request.append(b"/")
+		
+		query = parse_qs(urlsplit(request[1].decode("latin-1")).query)
+		session = {"tz": "UTC", "format": query.get("format", ["text"])[0].lower(),
+				   "year": query.get("year", [None])[0]}
+		if session["year"] is not None and (self.Archive is None
+											or session["year"] not in self.Archive.Paths):
+			session["year"] = None
+		
+		if "tz" in query:
+			user_tz = tz_valid(query["tz"][0])
+			if user_tz is None:
+				status = "400 Bad Request"
+			else:
+				session["tz"] = user_tz.upper()
+		
+		u_command = query.get("q", [""])[0]
+		if not u_command.strip() or status != "200 OK":
+			status = "400 Bad Request"
+			error_code, output = self.local(session, 1)
+		else:
+			error_code, output = await self.run(session, u_command)
+		
+		body = self.reply(session, u_command, error_code, output).encode("utf-8")
+		c_type = "application/json" if session["format"] == "json" else "text/plain"
+		head = "HTTP/1.0 {}\r\nContent-Type: {}; charset=utf-8\r\n".format(status, c_type)
+		head += "Content-Length: {}\r\nConnection: close\r\n\r\n".format(len(body))
+		writer.write(head.encode("latin-1") + body)
+		await writer.drain()
+
+
+async def serve(wc, host="127.0.0.1", port=8018, max_conn=64, watcher=None,
+				archive=None, help_msg=""):
+	"""Serve commands until the process is stopped."""
+	
+	q_server = QueryServer(wc, max_conn, watcher, archive, help_msg)
+	server = await asyncio.start_server(q_server.handle, host, port)
+	
+	print("Serving on {}:{} (at most {} connections)".format(host, port, max_conn))
+	async with server:
+		await server.serve_forever()
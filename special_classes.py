@@ -1,36 +1,140 @@
 # special_classes.py #
 # =====================================================================
-# DEFINE GROUP & MATCH DATA TYPES TO PARSE RAW JSON DATA.
-# MOST FUNCTIONS IN THE PROGRAM WILL USE THESE DATA OBJECTS
+# DEFINE TOURNAMENT & GROUP & MATCH & GOAL DATA TYPES TO PARSE RAW
+# JSON DATA. MOST FUNCTIONS IN THE PROGRAM WILL USE THESE DATA OBJECTS
 # TO READ THE NECESSARY INFORMATION.
 # 
+# ALL DATA TYPES DECLARE __slots__ TO KEEP THEM COMPACT AND FAST TO
+# READ, SINCE LARGE ARCHIVES HOLD A GREAT NUMBER OF THEM.
+# 
+# TEAM, PLAYER AND STADIUM NAMES ARE INTERNED INTO A SYMBOL TABLE AND
+# STORED AS SMALL INTEGERS. THEY ARE ONLY RESOLVED BACK TO TEXT WHEN
+# SOMETHING IS DISPLAYED.
+# 
+
+import heapq
+from bisect import bisect_right, insort
 
 from tzone_convert import *
 
+# reserved symbols for missing names(e.g. undecided teams) and draws.
+NO_NAME = 0
+DRAW = 1
+
+
+class SymbolTable:
+	"""Map every name in the data to a small integer and back."""
+	
+	__slots__ = ("Names", "IDs")
+	
+	def __init__(self):
+		
+		self.Names = ["", "Draw"]
+		self.IDs = {"": NO_NAME, "Draw": DRAW}
+	
+	def intern(self, t_name):
+		"""Return the integer for a name, adding it if it is new."""
+		
+		sid = self.IDs.get(t_name)
+		if sid is None:
+			sid = len(self.Names)
+			self.Names.append(t_name)
+			self.IDs[t_name] = sid
+		return sid
+	
+	def name(self, t_sid):
+		"""Return the name behind an integer."""
+		
+		return self.Names[t_sid]
+
+
+class Goal:
+	"""Initialize special Goal objects from raw json data."""
+	
+	__slots__ = ("Type", "MID", "Team", "When", "Player")
+	
+	def __init__(self, j_goal, symbols):
+		
+		self.Type = j_goal["Type"]
+		self.MID = j_goal["MID"]
+		self.Team = symbols.intern(j_goal["Team"])
+		self.When = j_goal["When"]
+		self.Player = symbols.intern(j_goal["Player"])
+	
+	def to_json(self, symbols):
+		"""Return the goal in raw json data layout."""
+		
+		return {"Type": self.Type, "MID": self.MID,
+				"Team": symbols.name(self.Team), "When": self.When,
+				"Player": symbols.name(self.Player)}
+
 
 class Match:
 	"""Initialize special Match objects from raw json data."""
 	
-	def __init__(self, j_match, user_tz):
-		"""Use titlecase for all data attributes."""
-		
-		self.ID = j_match.ID
-		self.Index = j_match.Index
-		self.Tzone = j_match.Tzone
-		self.Teams = j_match.Teams
-		self.Type = j_match.Type
-		self.Group = j_match.Group
-		self.Finished = j_match.Finished
-		self.Goals = j_match.Goals
-		self.Winner = j_match.Winner
-		self.Stadium = j_match.Stadium
-		self.Man_of_the_Match = j_match.Man_of_the_Match
-		
-		self.user_tz = user_tz
+	__slots__ = ("ID", "Index", "Tzone", "Teams", "Type", "Group", "Finished",
+				 "Goals", "Winner", "Stadium", "Man_of_the_Match", "Kickoff",
+				 "T0", "Score0", "Pscore0", "T1", "Score1", "Pscore1", "PSO",
+				 "Loser", "Feeders", "Slots", "Symbols")
+	
+	def __init__(self, j_match, wc_year, symbols):
+		"""Use titlecase for all data attributes. Names are stored as
+		integers from the shared symbol table."""
+		
+		self.Symbols = symbols
+		self.ID = j_match["ID"]
+		self.Index = j_match["Index"]
+		self.Tzone = j_match["Tzone"]
+		self.Type = j_match["Type"]
+		self.Group = j_match["Group"]
+		self.Kickoff = kickoff_utc(self.ID, wc_year, self.Tzone)
+		# Indexes of the matches whose results decide this match's teams,
+		# optional for knockout matches.
+		self.Feeders = tuple(j_match.get("Feeders", ()))
+		# group places(e.g. "A1") that decide a first knockout round
+		# match's teams, optional.
+		self.Slots = tuple(j_match.get("Slots", ()))
+		
+		self.read_progress(j_match)
+	
+	def read_progress(self, j_match):
+		"""Read the data that changes as the match is played and deduce
+		the match facts again."""
+		
+		symbols = self.Symbols
+		self.Teams = tuple(symbols.intern(team) for team in j_match["Teams"])
+		self.Finished = j_match["Finished"]
+		self.Goals = [Goal(goal, symbols) for goal in j_match["Goals"]]
+		self.Winner = symbols.intern(j_match["Winner"])
+		self.Stadium = symbols.intern(j_match["Stadium"])
+		self.Man_of_the_Match = symbols.intern(j_match["Man_of_the_Match"])
+		
 		self.auto_calc()
+	
+	def to_json(self):
+		"""Return the match in raw json data layout."""
+		
+		name = self.Symbols.name
+		
+		j_match = {"ID": self.ID, "Index": self.Index, "Tzone": self.Tzone,
+				   "Teams": [name(team) for team in self.Teams],
+				   "Type": self.Type, "Group": self.Group,
+				   "Stadium": name(self.Stadium), "Finished": self.Finished,
+				   "Goals": [goal.to_json(self.Symbols) for goal in self.Goals],
+				   "Winner": name(self.Winner),
+				   "Man_of_the_Match": name(self.Man_of_the_Match)}
+		if self.Feeders:
+			j_match["Feeders"] = list(self.Feeders)
+		if self.Slots:
+			j_match["Slots"] = list(self.Slots)
+		
+		return j_match
 		
 	def auto_calc(self):
-		"""Deduce match facts and store them for further calls."""
+		"""Deduce match facts and store them for further calls. The score
+		and shootout of one match are read from its own few goals, so a
+		live update only deduces the facts of the match it changes(the
+		tournament wide aggregates are in PrefixStats and Leaderboard)."""
 		
 		self.T0 = self.Teams[0]
 		self.Score0 = 0
@@ -39,12 +143,13 @@ class Match:
 		self.Score1 = 0
 		self.Pscore1 = 0
 		self.PSO = False
+		self.Loser = NO_NAME
 		
 		if self.Finished:
 			
 			# deduce the loser of the match.
 			if self.Winner not in self.Teams:
-				self.Loser = "Draw"
+				self.Loser = DRAW
 			else:
 				if self.Teams[0] == self.Winner:
 					self.Loser = self.Teams[1]
@@ -76,53 +181,58 @@ class Match:
 						elif goal.Team == self.T1:
 							self.Pscore1 += 1
 		
-	def display_result(self, t_team="default"):
+	def display_result(self, out, t_team="default"):
 		"""Display match result with the selected team shown first."""
 		
+		n0 = self.Symbols.name(self.T0)
+		n1 = self.Symbols.name(self.T1)
+		
 		msg0 = "{:15}{} - {}{:>15}".format(
-		self.T0, self.Score0, self.Score1, self.T1
+		n0, self.Score0, self.Score1, n1
 		)
 		msg1 = "{:15}{} - {}{:>15}".format(
-		self.T1, self.Score1, self.Score0, self.T0
+		n1, self.Score1, self.Score0, n0
 		)
 		msg_p0 = "{:15}{}({}P) - {}({}P){:>15}".format(
-		self.T0, self.Score0, self.Pscore0,
-		self.Score1, self.Pscore1, self.T1
+		n0, self.Score0, self.Pscore0,
+		self.Score1, self.Pscore1, n1
 		)
 		msg_p1 = "{:15}{}({}P) - {}({}P){:>15}".format(
-		self.T1, self.Score1, self.Pscore1,
-		self.Score0, self.Pscore0, self.T0
+		n1, self.Score1, self.Pscore1,
+		self.Score0, self.Pscore0, n0
 		)
 		
 		if self.Finished:
 			if t_team == "default" or t_team == self.T0:
 				if self.PSO:
-					print(msg_p0)
+					print(msg_p0, file=out)
 				else:
-					print(msg0)
+					print(msg0, file=out)
 			else:
 				if self.PSO:
-					print(msg_p1)
+					print(msg_p1, file=out)
 				else:
-					print(msg1)
+					print(msg1, file=out)
 	
-	def display_schedule(self, t_team="default"):
+	def display_schedule(self, out, user_tz, t_team="default"):
 		"""Display date and time for the match adjusted for 
 		time zone difference."""
 		
-		ltime = tz_digest(self.ID, self.user_tz, self.Tzone)
-		msg0 = "{:15}VS.{:>15}     will be held on {}".format(self.T0, 
-		self.T1, ltime)
-		msg1 = "{:15}VS.{:>15}     will be held on {}".format(self.T1, 
-		self.T0, ltime)
+		ltime = tz_digest(self.Kickoff, user_tz, self.Tzone)
+		n0 = self.Symbols.name(self.T0)
+		n1 = self.Symbols.name(self.T1)
+		msg0 = "{:15}VS.{:>15}     will be held on {}".format(n0, 
+		n1, ltime)
+		msg1 = "{:15}VS.{:>15}     will be held on {}".format(n1, 
+		n0, ltime)
 		
 		if not self.Finished:
 			if t_team == "default" or t_team == self.T0:
-				print(msg0)
+				print(msg0, file=out)
 			else:
-				print(msg1)
+				print(msg1, file=out)
 	
-	def display_goals(self, t_team="default"):
+	def display_goals(self, out, t_team="default"):
 		"""Show all goals scored by the selected team."""
 		
 		g_msg = "Goal {}:    at {:03}'        by {:25}   for {:12}"
@@ -130,36 +240,37 @@ class Match:
 		pg_msg = "Penalty {}:     by {:25}   for {:12}"
 		gn = 1
 		pn = 1
+		name = self.Symbols.name
 		
 		for goal in self.Goals:
 			if goal.Type != "P":
 				if goal.Team == self.T0 and t_team != self.T1:
 					if goal.Type == "N":
-						print(g_msg.format(gn, goal.When, goal.Player, goal.Team))
+						print(g_msg.format(gn, goal.When, name(goal.Player), name(goal.Team)), file=out)
 						gn += 1
 					else:
-						print(og_msg.format(gn, goal.When, goal.Player, goal.Team))
+						print(og_msg.format(gn, goal.When, name(goal.Player), name(goal.Team)), file=out)
 						gn += 1
 				elif goal.Team == self.T1 and t_team != self.T0:
 					if goal.Type == "N":
-						print(g_msg.format(gn, goal.When, goal.Player, goal.Team))
+						print(g_msg.format(gn, goal.When, name(goal.Player), name(goal.Team)), file=out)
 						gn += 1
 					else:
-						print(og_msg.format(gn, goal.When, goal.Player, goal.Team))
+						print(og_msg.format(gn, goal.When, name(goal.Player), name(goal.Team)), file=out)
 						gn += 1
 				else:
 					continue
 			else:
 				if goal.Team == self.T0 and t_team != self.T1:
-					print(pg_msg.format(pn, goal.Player, goal.Team))
+					print(pg_msg.format(pn, name(goal.Player), name(goal.Team)), file=out)
 					pn += 1
 				elif goal.Team == self.T1 and t_team != self.T0:
-					print(pg_msg.format(pn, goal.Player, goal.Team))
+					print(pg_msg.format(pn, name(goal.Player), name(goal.Team)), file=out)
 					pn += 1
 				else:
 					continue
 	
-	def display_full_detail(self):
+	def display_full_detail(self, out, user_tz):
 		"""Show all available information about the match."""
 		
 		if self.Type == "Group":
@@ -167,92 +278,759 @@ class Match:
 		else:
 			mty = self.Type
 		
-		fd_msg = mty + "\nStadium:   {}".format(self.Stadium)
-		print(fd_msg)
+		fd_msg = mty + "\nStadium:   {}".format(self.Symbols.name(self.Stadium))
+		print(fd_msg, file=out)
 		
 		if self.Finished:
-			print("\nResult:")
-			self.display_result()
-			print("\nGoals:")
-			self.display_goals()
-			print("\nMan of the Match:   {}".format(self.Man_of_the_Match))
+			print("\nResult:", file=out)
+			self.display_result(out)
+			print("\nGoals:", file=out)
+			self.display_goals(out)
+			print("\nMan of the Match:   {}".format(
+			self.Symbols.name(self.Man_of_the_Match)), file=out)
 		else:
-			print("Match Schedule:")
-			self.display_schedule()
+			print("Match Schedule:", file=out)
+			self.display_schedule(out, user_tz)
+
+
+def result_row(match, team):
+	"""Return the [MP, W, D, L, GF, GD, Pts] a team gains from a finished
+	match."""
+	
+	row = [1, 0, 0, 0, 0, 0, 0]
+	if team == match.Winner:
+		row[1] = 1
+		row[6] = 3
+	elif match.Winner == DRAW:
+		row[2] = 1
+		row[6] = 1
+	else:
+		row[3] = 1
+	
+	for goal in match.Goals:
+		if goal.Type == "P":
+			continue
+		elif goal.Team == team:
+			row[4] += 1
+			row[5] += 1
+		else:
+			row[5] -= 1
+	
+	return row
+
+
+def standings_order(teams, t_rows):
+	"""Order teams by points, goal difference and goals scored, ties
+	keep the given order."""
+	
+	return sorted(teams, key=lambda t: (-t_rows[t][6], -t_rows[t][5], -t_rows[t][4]))
+
+
+class StandingsTable:
+	"""Keep a group's standings up to date one match at a time, with
+	rows ordered by points, goal difference and goals scored."""
+	
+	__slots__ = ("Rows", "Order", "Applied")
+	
+	def __init__(self, teams, matches):
+		"""Tally every finished match once."""
+		
+		self.Rows = {team: [0, 0, 0, 0, 0, 0, 0] for team in teams}
+		self.Order = list(teams)
+		self.Applied = {}
+		
+		for match in matches:
+			self.update_match(match, False)
+		self.sort()
+	
+	def match_stats(self, match):
+		"""Return the stats each team of the table gains from a match."""
+		
+		m_stats = {}
+		if not match.Finished:
+			return m_stats
+		
+		for team in match.Teams:
+			if team not in self.Rows or team in m_stats:
+				continue
+			m_stats[team] = result_row(match, team)
+		
+		return m_stats
+	
+	def update_match(self, match, resort=True):
+		"""Replace what a match contributed before with its current result
+		and goals. Only the teams of that match are touched."""
+		
+		for team, row in self.Applied.pop(match.ID, {}).items():
+			t_row = self.Rows[team]
+			for n in range(7):
+				t_row[n] -= row[n]
+		
+		m_stats = self.match_stats(match)
+		for team, row in m_stats.items():
+			t_row = self.Rows[team]
+			for n in range(7):
+				t_row[n] += row[n]
+		if m_stats:
+			self.Applied[match.ID] = m_stats
+		
+		if resort:
+			self.sort()
+	
+	def sort(self):
+		"""Order the rows, ties keep the original group order."""
+		
+		self.Order = standings_order(self.Rows, self.Rows)
+	
+	def rows(self):
+		"""Return (team, stats) pairs from top to bottom."""
+		
+		return [(team, self.Rows[team]) for team in self.Order]
 
 
 class Group:
 	"""Initialize special Group objects from raw json data."""
 	
-	def __init__(self, j_group, jm_list, user_tz):
+	__slots__ = ("ID", "Teams", "MIDs", "Matches", "Symbols", "Standings")
+	
+	def __init__(self, j_group, match_reg, symbols):
+		"""Refer to the shared Match objects registered under each ID."""
 		
-		self.ID = j_group.ID
-		self.Teams = j_group.Teams
-		self.MIDs = j_group.Matches
+		self.Symbols = symbols
+		self.ID = j_group["ID"]
+		self.Teams = tuple(symbols.intern(team) for team in j_group["Teams"])
+		self.MIDs = tuple(j_group["Matches"])
 		
-		self.Matches = []
-		for mid in self.MIDs:
-			for jmatch in jm_list:
-				if mid == jmatch.ID:
-					self.Matches.append(Match(jmatch, user_tz))
+		self.Matches = [match_reg[mid] for mid in self.MIDs if mid in match_reg]
+		self.Standings = StandingsTable(self.Teams, self.Matches)
+	
+	def to_json(self):
+		"""Return the group in raw json data layout."""
 		
-	def display_standings(self):
-		"""Calculate various stats for each team and display them in 
-		standardized format."""
+		return {"ID": self.ID,
+				"Teams": [self.Symbols.name(team) for team in self.Teams],
+				"Matches": list(self.MIDs)}
 		
-		title = "Team            MP   W   D   L   GF   GD   Pts"
-		std = "{:<16}{:>2}   {}   {}   {}   {:>2}  {:>3}   {:>3}"
-		print(title)
-		
-		for team in self.Teams:
-			mp = 0
-			w = 0
-			d = 0
-			l = 0
-			gf = 0
-			gd = 0
-			pts = 0
-			for match in self.Matches:
-				if match.Finished:
-					if team in match.Teams:
-						mp += 1
-						if team == match.Winner:
-							w += 1
-							pts += 3
-						elif match.Winner == "Draw":
-							d += 1
-							pts += 1
-						else:
-							l += 1
-						for goal in match.Goals:
-							if goal.Team == team and goal.Type != "P":
-								gf += 1
-								gd += 1
-							elif goal.Team != team and goal.Type != "P":
-								gd -= 1
-			
-			tstd = std.format(team, mp, w, d, l, gf, gd, pts)
-			print(tstd)
+	def standing_rows(self, prefix=None, as_of=None):
+		"""Return (team, stats) pairs from top to bottom, as of a match
+		Index if one is given."""
+		
+		if as_of is None:
+			return self.Standings.rows()
+		
+		t_rows = {team: prefix.team_row(team, as_of, True) for team in self.Teams}
+		return [(team, t_rows[team]) for team in standings_order(self.Teams, t_rows)]
 	
-	def display_m_standings(self):
-		"""Reuse Match class methods to display match info."""
+	def match_lists(self, as_of=None):
+		"""Return the finished and the upcoming matches of the group. As of
+		a match Index only the matches finished by then are returned."""
 		
 		fin = []
 		ufin = []
 		
 		for match in self.Matches:
-			if match.Finished:
+			if as_of is not None:
+				if match.Finished and match.Index <= as_of:
+					fin.append(match)
+			elif match.Finished:
 				fin.append(match)
 			else:
 				ufin.append(match)
 		
+		return fin, ufin
+	
+	def display_standings(self, out, prefix=None, as_of=None):
+		"""Display the standings table in standardized format, as of a
+		match Index if one is given."""
+		
+		title = "Team            MP   W   D   L   GF   GD   Pts"
+		std = "{:<16}{:>2}   {}   {}   {}   {:>2}  {:>3}   {:>3}"
+		print(title, file=out)
+		
+		for team, row in self.standing_rows(prefix, as_of):
+			tstd = std.format(self.Symbols.name(team), *row)
+			print(tstd, file=out)
+	
+	def display_m_standings(self, out, user_tz, as_of=None):
+		"""Reuse Match class methods to display match info. As of a match
+		Index only the matches finished by then are shown."""
+		
+		fin, ufin = self.match_lists(as_of)
+		
 		if fin:
-			print("Finished Matches:")
+			print("Finished Matches:", file=out)
 			for fmatch in fin:
-				fmatch.display_result()
+				fmatch.display_result(out)
 		
 		if ufin:
-			print("\nUpcoming Matches:")
+			print("\nUpcoming Matches:", file=out)
 			for umatch in ufin:
-				umatch.display_schedule()
+				umatch.display_schedule(out, user_tz)
+
+
+class PrefixStats:
+	"""Walk the finished matches once in Index order and keep cumulative
+	per-team and per-player stats after each of them, so the state as of
+	any match Index is found with a binary search."""
+	
+	__slots__ = ("Version", "Teams", "Groups", "Players", "Scorers", "Totals")
+	
+	def __init__(self, all_matches, version=0):
+		"""Each entry is a pair of lists: the match Indexes and the
+		cumulative values right after those matches."""
+		
+		self.Version = version
+		self.Teams = {}
+		self.Groups = {}
+		self.Players = {}
+		# players in the order of their first goal, like a Counter.
+		self.Scorers = []
+		self.Totals = ([], [])
+		
+		for match in sorted(all_matches, key=lambda i: i.Index):
+			if not match.Finished:
+				continue
+			for team in set(match.Teams):
+				if team == NO_NAME:
+					continue
+				row = result_row(match, team)
+				self.add_row(self.Teams, team, match.Index, row)
+				if match.Type == "Group":
+					self.add_row(self.Groups, team, match.Index, row)
+			
+			for goal in match.Goals:
+				if goal.Type != "N":
+					continue
+				if goal.Player not in self.Players:
+					self.Players[goal.Player] = ([], [])
+					self.Scorers.append(goal.Player)
+				self.add_count(self.Players[goal.Player], match.Index)
+				self.add_count(self.Totals, match.Index)
+	
+	def add_row(self, t_map, t_key, t_index, row):
+		"""Add a match result on top of the last cumulative row."""
+		
+		marks, rows = t_map.setdefault(t_key, ([], []))
+		if rows:
+			row = [a + b for a, b in zip(rows[-1], row)]
+		marks.append(t_index)
+		rows.append(row)
+	
+	def add_count(self, entry, t_index):
+		"""Count one more goal at a match Index."""
+		
+		marks, counts = entry
+		if marks and marks[-1] == t_index:
+			counts[-1] += 1
+		else:
+			marks.append(t_index)
+			counts.append(counts[-1] + 1 if counts else 1)
+	
+	def at(self, entry, as_of, empty):
+		"""Return the cumulative value after the last match up to as_of,
+		or after all matches if as_of is None."""
+		
+		marks, values = entry
+		n = len(marks) if as_of is None else bisect_right(marks, as_of)
+		return values[n - 1] if n else empty
+	
+	def team_row(self, t_team, as_of=None, group_only=False):
+		"""Return [MP, W, D, L, GF, GD, Pts] of a team as of a match."""
+		
+		t_map = self.Groups if group_only else self.Teams
+		return list(self.at(t_map.get(t_team, ([], [])), as_of, [0] * 7))
+	
+	def scorers(self, as_of=None):
+		"""Return ("Total", goals) followed by (player, goals) pairs from
+		most to least, or an empty list if nobody had scored."""
+		
+		total = self.at(self.Totals, as_of, 0)
+		if not total:
+			return []
+		
+		s_list = [(player, self.at(self.Players[player], as_of, 0))
+				  for player in self.Scorers]
+		s_list = sorted([s for s in s_list if s[1]], key=lambda s: -s[1])
+		return [("Total", total)] + s_list
+
+
+class Leaderboard:
+	"""Keep the goal tally of every player up to date one match at a
+	time. A heap orders the players by goals(ties by who scored first),
+	so the top N are read without recounting or sorting everybody."""
+	
+	__slots__ = ("Counts", "Keys", "Entries", "Applied", "Heap", "Total",
+				 "Freq", "Levels")
+	
+	def __init__(self, all_matches):
+		"""Tally every finished match once. Only regular goals count for
+		the player, own goals and shootout goals are left out."""
+		
+		self.Counts = {}
+		self.Keys = {}
+		# player -> {match ID: (goals, position of the first one)}.
+		self.Entries = {}
+		self.Applied = {}
+		self.Heap = []
+		self.Total = 0
+		# how many players hold each goal count, and the distinct counts
+		# in ascending order, for ranks.
+		self.Freq = {}
+		self.Levels = []
+		
+		for match in all_matches:
+			self.update_match(match)
+	
+	def update_match(self, match):
+		"""Replace what a match contributed before with its current goals.
+		Only the players of that match are touched."""
+		
+		touched = set()
+		for player in self.Applied.pop(match.ID, ()):
+			entry = self.Entries[player].pop(match.ID)
+			self.Total -= entry[0]
+			touched.add(player)
+		
+		m_goals = {}
+		if match.Finished:
+			for n, goal in enumerate(match.Goals):
+				if goal.Type == "N":
+					goals, pos = m_goals.get(goal.Player, (0, (match.Index, n)))
+					m_goals[goal.Player] = (goals + 1, pos)
+		for player, entry in m_goals.items():
+			self.Entries.setdefault(player, {})[match.ID] = entry
+			self.Total += entry[0]
+			touched.add(player)
+		if m_goals:
+			self.Applied[match.ID] = tuple(m_goals)
+		
+		for player in touched:
+			self.refresh(player)
+	
+	def refresh(self, player):
+		"""Recount a player and push the new standing onto the heap. The
+		old heap entry is left behind and skipped when read."""
+		
+		old = self.Counts.pop(player, 0)
+		self.Keys.pop(player, None)
+		if old:
+			self.Freq[old] -= 1
+			if not self.Freq[old]:
+				del self.Freq[old]
+				self.Levels.remove(old)
+		
+		entries = self.Entries.get(player)
+		if not entries:
+			self.Entries.pop(player, None)
+			return
+		
+		goals = sum(entry[0] for entry in entries.values())
+		key = min(entry[1] for entry in entries.values())
+		self.Counts[player] = goals
+		self.Keys[player] = key
+		if goals not in self.Freq:
+			self.Freq[goals] = 0
+			insort(self.Levels, goals)
+		self.Freq[goals] += 1
+		heapq.heappush(self.Heap, (-goals, key, player))
+		
+		# stale entries are cleared out once they outnumber the live ones.
+		if len(self.Heap) > 2 * len(self.Counts) + 16:
+			self.Heap = [(-g, self.Keys[p], p) for p, g in self.Counts.items()]
+			heapq.heapify(self.Heap)
+	
+	def top(self, n=None):
+		"""Return the best n(or all) (player, goals) pairs from most to
+		least, ties by who scored first."""
+		
+		if n is None:
+			n = len(self.Counts)
+		
+		found = []
+		seen = set()
+		while self.Heap and len(found) < n:
+			item = heapq.heappop(self.Heap)
+			neg, key, player = item
+			if (player in seen or self.Counts.get(player) != -neg
+					or self.Keys[player] != key):
+				continue
+			seen.add(player)
+			found.append(item)
+		
+		for item in found:
+			heapq.heappush(self.Heap, item)
+		
+		return [(player, -neg) for neg, key, player in found]
+	
+	def scorers(self, n=None):
+		"""Return ("Total", goals) followed by the top n(player, goals)
+		pairs, or an empty list if nobody has scored."""
+		
+		if not self.Total:
+			return []
+		return [("Total", self.Total)] + self.top(n)
+	
+	def rank(self, player):
+		"""Return the goals and rank of a player, players with the same
+		goals share a rank. Return None if the player has not scored."""
+		
+		goals = self.Counts.get(player)
+		if goals is None:
+			return None
+		return goals, len(self.Levels) - bisect_right(self.Levels, goals) + 1
+
+
+class KnockoutBracket:
+	"""Build the knockout stage as a tree, from the Final down to the
+	first knockout round. Every match is a node that can be looked up by
+	its ID. Any number of rounds is supported(e.g. a Round of 32)."""
+	
+	__slots__ = ("Version", "Rounds", "Root", "Third", "Nodes")
+	
+	def __init__(self, all_matches, version=0):
+		"""Rounds are the knockout match types in order of play. The two
+		feeders of a match are its "Feeders" if the data gives them, or
+		else the matches of the previous round its teams have won. What is
+		still undecided is filled in with the remaining matches of the
+		previous round in Index order."""
+		
+		self.Version = version
+		self.Rounds = []
+		self.Root = None
+		self.Third = None
+		# match ID -> (match, feeder IDs).
+		self.Nodes = {}
+		
+		rounds = {}
+		for match in sorted(all_matches, key=lambda i: i.Index):
+			if match.Type == "Group":
+				continue
+			elif match.Type == "3rd Place Playoff":
+				self.Third = match
+				continue
+			if match.Type not in rounds:
+				self.Rounds.append(match.Type)
+				rounds[match.Type] = []
+			rounds[match.Type].append(match)
+		
+		if not self.Rounds:
+			return
+		
+		for match in rounds[self.Rounds[0]]:
+			self.Nodes[match.ID] = (match, ())
+		
+		for prev, r_type in zip(self.Rounds, self.Rounds[1:]):
+			p_matches = rounds[prev]
+			p_index = {p.Index: p.ID for p in p_matches}
+			winners = {p.Winner: p.ID for p in p_matches if p.Finished}
+			used = set()
+			feeders = {}
+			
+			for match in rounds[r_type]:
+				found = [p_index[i] for i in match.Feeders if i in p_index]
+				if not found:
+					found = [winners[t] for t in match.Teams if t in winners]
+				found = [mid for mid in found if mid not in used][:2]
+				used.update(found)
+				feeders[match.ID] = found
+			
+			spare = [p.ID for p in p_matches if p.ID not in used]
+			for match in rounds[r_type]:
+				found = feeders[match.ID]
+				while len(found) < 2 and spare:
+					found.append(spare.pop(0))
+				if not match.Feeders:
+					found.sort(key=lambda mid: self.Nodes[mid][0].Index)
+				self.Nodes[match.ID] = (match, tuple(found))
+		
+		self.Root = rounds[self.Rounds[-1]][0]
+	
+	def node(self, t_mid):
+		"""Return the match with an ID and the IDs of its feeders."""
+		
+		return self.Nodes[t_mid]
+	
+	def first_round(self):
+		"""Return the matches of the first knockout round in the order
+		they appear in the bracket."""
+		
+		found = []
+		
+		def walk(t_mid):
+			match, feeders = self.Nodes[t_mid]
+			if match.Type == self.Rounds[0]:
+				found.append(match)
+			for f_mid in feeders:
+				walk(f_mid)
+		
+		if self.Root is not None:
+			walk(self.Root.ID)
+		return found
+
+
+class TournamentIndex:
+	"""Map each team to its matches so team commands avoid full scans."""
+	
+	__slots__ = ("All", "Fin", "Ufin", "Pairs")
+	
+	def __init__(self, all_matches):
+		"""Sort once by Index, then file every match under both teams."""
+		
+		self.All = {}
+		self.Fin = {}
+		self.Ufin = {}
+		self.Pairs = {}
+		
+		for match in sorted(all_matches, key=lambda i: i.Index):
+			for team in set(match.Teams):
+				if team == NO_NAME:
+					continue
+				self.All.setdefault(team, []).append(match)
+				if match.Finished:
+					self.Fin.setdefault(team, []).append(match)
+				else:
+					self.Ufin.setdefault(team, []).append(match)
+			
+			pair = tuple(sorted(match.Teams))
+			self.Pairs.setdefault(pair, []).append(match)
+	
+	def refresh(self, match, old_teams):
+		"""File a match again after its teams or Finished flag changed."""
+		
+		for team in set(old_teams) | set(match.Teams):
+			if team == NO_NAME:
+				continue
+			for t_map in (self.All, self.Fin, self.Ufin):
+				if match in t_map.get(team, []):
+					t_map[team].remove(match)
+			if team in match.Teams:
+				self.insert(self.All, team, match)
+				if match.Finished:
+					self.insert(self.Fin, team, match)
+				else:
+					self.insert(self.Ufin, team, match)
+		
+		old_pair = tuple(sorted(old_teams))
+		if match in self.Pairs.get(old_pair, []):
+			self.Pairs[old_pair].remove(match)
+		self.insert(self.Pairs, tuple(sorted(match.Teams)), match)
+	
+	def insert(self, t_map, t_key, match):
+		"""Add a match to one list of the index, keeping Index order."""
+		
+		m_list = t_map.setdefault(t_key, [])
+		m_list.append(match)
+		m_list.sort(key=lambda i: i.Index)
+	
+	def matches(self, t_team):
+		"""Return all matches of a team in Index order."""
+		
+		return self.All.get(t_team, [])
+	
+	def finished(self, t_team):
+		"""Return finished matches of a team in Index order."""
+		
+		return self.Fin.get(t_team, [])
+	
+	def upcoming(self, t_team):
+		"""Return unfinished matches of a team in Index order."""
+		
+		return self.Ufin.get(t_team, [])
+	
+	def versus(self, t_1, t_2):
+		"""Return the matches fought between two teams in Index order."""
+		
+		if t_1 == t_2:
+			return self.matches(t_1)
+		return self.Pairs.get(tuple(sorted((t_1, t_2))), [])
+
+
+def tournament_meetings(wc):
+	"""Return the finished matches of a tournament as plain tuples of
+	(year, Index, ID, type, group, teams, score, penalties, winner), with
+	names as in the data and penalties None without a shoot-out. They
+	keep nothing of the model alive."""
+	
+	name = wc.Symbols.name
+	meetings = []
+	
+	for match in sorted(wc.Matches, key=lambda i: i.Index):
+		if not match.Finished or NO_NAME in match.Teams or match.T0 == match.T1:
+			continue
+		penalties = (match.Pscore0, match.Pscore1) if match.PSO else None
+		meetings.append((wc.Year, match.Index, match.ID, match.Type, match.Group,
+						 (name(match.T0), name(match.T1)), (match.Score0, match.Score1),
+						 penalties, name(match.Winner)))
+	
+	return meetings
+
+
+def load_meetings(loader, t_data_path):
+	"""Load a tournament and return its data version and its meetings.
+	Run in worker processes, so only the tuples travel back."""
+	
+	wc = loader(t_data_path)
+	return wc.Version, tournament_meetings(wc)
+
+
+def meeting_line(meeting, t_team):
+	"""Return the result of a meeting with a team(titlecase) shown first,
+	as Match.display_result prints it."""
+	
+	teams, score, penalties = meeting[5:8]
+	p_score = penalties or (0, 0)
+	if teams[0].title() == t_team:
+		n0, n1, s0, s1, p0, p1 = teams + score + p_score
+	else:
+		n1, n0, s1, s0, p1, p0 = teams + score + p_score
+	
+	if penalties is not None:
+		return "{:15}{}({}P) - {}({}P){:>15}".format(n0, s0, p0, s1, p1, n1)
+	return "{:15}{} - {}{:>15}".format(n0, s0, s1, n1)
+
+
+class HeadToHead:
+	"""Keep every meeting of every pair of teams over one or more
+	tournaments, with the running record of each pair. Teams are keyed
+	by their titlecase names, so the same team matches across
+	tournaments. Meetings are the plain tuples of tournament_meetings."""
+	
+	__slots__ = ("Pairs", "Opponents")
+	
+	def __init__(self, tournaments=()):
+		
+		# (team, team) in sorted order -> [meetings, record of the first
+		# team as [MP, W, D, L, GF, GA]].
+		self.Pairs = {}
+		self.Opponents = {}
+		
+		for wc in tournaments:
+			self.add(tournament_meetings(wc))
+	
+	def add(self, meetings):
+		"""Add the meetings of a tournament."""
+		
+		for meeting in meetings:
+			teams, score = meeting[5:7]
+			winner = meeting[8]
+			t_0, t_1 = sorted(team.title() for team in teams)
+			
+			m_list, record = self.Pairs.setdefault((t_0, t_1), [[], [0] * 6])
+			m_list.append(meeting)
+			if teams[0].title() == t_0:
+				s_0, gf, ga = teams[0], score[0], score[1]
+			else:
+				s_0, gf, ga = teams[1], score[1], score[0]
+			for n, value in enumerate((1, winner == s_0, winner == "Draw",
+									   winner not in (s_0, "Draw"), gf, ga)):
+				record[n] += value
+			
+			self.Opponents.setdefault(t_0, set()).add(t_1)
+			self.Opponents.setdefault(t_1, set()).add(t_0)
+	
+	def record(self, t_1, t_2):
+		"""Return the meetings of two teams and the record of the first
+		team against the second, or None if they never met."""
+		
+		if t_1 <= t_2:
+			found = self.Pairs.get((t_1, t_2))
+			if found is None:
+				return None
+			return found[0], list(found[1])
+		
+		found = self.Pairs.get((t_2, t_1))
+		if found is None:
+			return None
+		mp, w, d, l, gf, ga = found[1]
+		return found[0], [mp, l, d, w, ga, gf]
+	
+	def opponents(self, t_team):
+		"""Return (opponent, record) pairs of a team against everyone it
+		has met, in alphabetical order."""
+		
+		return [(t_opp, self.record(t_team, t_opp)[1])
+				for t_opp in sorted(self.Opponents.get(t_team, ()))]
+
 
+class Tournament:
+	"""Build the whole tournament model from raw json data in one pass."""
+	
+	__slots__ = ("Year", "Host", "Number", "Symbols", "Matches", "Registry",
+				 "Groups", "Group_IDs", "Teams", "Team_IDs", "Awards", "Index",
+				 "Leaderboard", "Version", "Log_offset", "Prefix",
+				 "Bracket", "Head_to_head")
+	
+	def __init__(self, j_data):
+		"""Matches are registered by ID so groups can share them. Team
+		names in titlecase(as typed in commands) map to their symbols."""
+		
+		j_meta = j_data["Meta"]
+		self.Year = j_meta["Year"]
+		self.Host = j_meta["Host"]
+		self.Number = j_meta["Tournament_No."]
+		self.Symbols = SymbolTable()
+		
+		self.Matches = []
+		self.Registry = {}
+		for j_match in j_data["Matches"]:
+			n_match = Match(j_match, self.Year, self.Symbols)
+			self.Matches.append(n_match)
+			self.Registry[n_match.ID] = n_match
+		
+		self.Groups = []
+		self.Teams = []
+		self.Team_IDs = {}
+		for j_group in j_data["Groups"]:
+			n_group = Group(j_group, self.Registry, self.Symbols)
+			self.Groups.append(n_group)
+			for gt in n_group.Teams:
+				t_name = self.Symbols.name(gt).title()
+				self.Teams.append(t_name)
+				self.Team_IDs[t_name] = gt
+		self.Group_IDs = [group.ID for group in self.Groups]
+		
+		self.Awards = dict(j_data["Awards"])
+		self.Index = TournamentIndex(self.Matches)
+		self.Leaderboard = Leaderboard(self.Matches)
+		
+		# bumped whenever the model changes after loading.
+		self.Version = 0
+		# how far the event log has been replayed into the model.
+		self.Log_offset = 0
+		# built on first use, see prefix(), bracket() and head_to_head().
+		self.Prefix = None
+		self.Bracket = None
+		self.Head_to_head = None
+	
+	def to_json(self):
+		"""Return the whole tournament in raw json data layout."""
+		
+		return {"Meta": {"Year": self.Year, "Host": self.Host,
+						 "Tournament_No.": self.Number},
+				"Matches": [match.to_json() for match in self.Matches],
+				"Groups": [group.to_json() for group in self.Groups],
+				"Awards": dict(self.Awards)}
+	
+	def prefix(self):
+		"""Return the prefix stats of the current data, rebuilt on first
+		use after the data version changes."""
+		
+		if self.Prefix is None or self.Prefix.Version != self.Version:
+			self.Prefix = PrefixStats(self.Matches, self.Version)
+		return self.Prefix
+	
+	def bracket(self):
+		"""Return the knockout bracket of the current data, rebuilt on
+		first use after the data version changes."""
+		
+		if self.Bracket is None or self.Bracket.Version != self.Version:
+			self.Bracket = KnockoutBracket(self.Matches, self.Version)
+		return self.Bracket
+	
+	def head_to_head(self):
+		"""Return the head-to-head records of the current data, rebuilt
+		on first use after the data version changes."""
+		
+		if self.Head_to_head is None or self.Head_to_head[0] != self.Version:
+			self.Head_to_head = (self.Version, HeadToHead([self]))
+		return self.Head_to_head[1]
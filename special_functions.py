@@ -4,10 +4,10 @@
 # THESE FUNCTIONS REPORT ON THE MORE GENERAL INFORMATION ABOUT THE TOURNAMENT.
 # 
 
-from collections import Counter
+from special_classes import *
 
 
-def display_news(all_matches):
+def display_news(out, all_matches):
 	"""List the results of the latest three matches."""
 	
 	fin = []
@@ -17,21 +17,21 @@ def display_news(all_matches):
 			fin.append(match)
 	
 	if not fin:
-		print("\nNo match history")
+		print("\nNo match history", file=out)
 	else:
 		fin = sorted(fin, key=lambda i: i.Index, reverse=True)
 		while len(fin) > 3:
 			fin.pop()
 		else:
-			print("\n********** Latest Results **********\n")
+			print("\n********** Latest Results **********\n", file=out)
 			for f_match in fin:
-				f_match.display_result()
+				f_match.display_result(out)
 				
-	print("")
+	print("", file=out)
 	return 0
 
 
-def display_up_schedule(all_matches):
+def display_up_schedule(out, all_matches, user_tz):
 	"""List the time schedule for the nearest three upcoming matches if any."""
 	
 	ufin = []
@@ -41,58 +41,59 @@ def display_up_schedule(all_matches):
 			ufin.append(match)
 	
 	if not ufin:
-		print("\nNo known schedule")
+		print("\nNo known schedule", file=out)
 	else:
 		ufin = sorted(ufin, key=lambda i: i.Index, reverse=False)
 		while len(ufin) > 3:
 			ufin.pop()
 		else:
-			print("\n********** Upcoming Matches **********\n")
+			print("\n********** Upcoming Matches **********\n", file=out)
 			for uf_match in ufin:
-				if uf_match.T0 != "" and uf_match.T1 != "":
-					uf_match.display_schedule()
+				if uf_match.T0 != NO_NAME and uf_match.T1 != NO_NAME:
+					uf_match.display_schedule(out, user_tz)
 				
-	print("")
+	print("", file=out)
 	return 0
 
 
-def display_awards(all_matches, wc_awards):
+def display_awards(out, all_matches, wc_awards):
 	"""List all the awards given to players and teams."""
 	
 	if not all_matches[-1].Finished or all_matches[-1].Type != "Final":
-		print("\nNot available until World Cup is over.\n")
+		print("\nNot available until World Cup is over.\n", file=out)
 		return 0
 	
-	print("\n********** World Cup Awards **********\n")
+	print("\n********** World Cup Awards **********\n", file=out)
 	
 	for award, winner in wc_awards.items():
 		award += ":"
-		print("{:30}{}".format(award, winner))
+		print("{:30}{}".format(award, winner), file=out)
 		
-	print("")
+	print("", file=out)
 	return 0
 
 
-def display_top_scorers(all_matches):
-	"""List all players that have scored from most to least."""
-	
-	all_names = []
-	for match in all_matches:
-		if match.Finished:
-			for goal in match.Goals:
-				if goal.Type == "N":
-					all_names.append(goal.Player)
-	
-	if all_names:
-		scorer_cnt = Counter(all_names)
-		scorer_list = scorer_cnt.most_common(len(scorer_cnt))
-		scorer_list = [("Total", len(all_names))] + scorer_list
+def display_top_scorers(out, leaderboard, symbols, top_n=None, prefix=None,
+						as_of=None):
+	"""List all players(or the best top_n) that have scored from most to
+	least, as of a match Index if one is given."""
+	
+	if top_n is not None and top_n < 1:
+		return 1
+	
+	if as_of is not None:
+		scorer_list = prefix.scorers(as_of)
+		if top_n is not None:
+			scorer_list = scorer_list[:top_n + 1]
 	else:
-		print("No goals yet\n")
+		scorer_list = leaderboard.scorers(top_n)
+	
+	if not scorer_list:
+		print("No goals yet\n", file=out)
 		return 0
 	
-	print("\n********** Best Scorers **********\n")
-	print("{:2}   {:^25}      {}".format(" #", "Name", "Goals"))
+	print("\n********** Best Scorers **********\n", file=out)
+	print("{:2}   {:^25}      {}".format(" #", "Name", "Goals"), file=out)
 	
 	amt = 9999
 	rank = -1
@@ -100,25 +101,45 @@ def display_top_scorers(all_matches):
 		if amount < amt:
 			rank += 1
 			amt = amount
-		print("{:2}   {:^25}      {}".format(rank, name, amount))
+		if name != "Total":
+			name = symbols.name(name)
+		print("{:2}   {:^25}      {}".format(rank, name, amount), file=out)
 	
-	print("")	
+	print("", file=out)	
 	return 0
 
 
-def display_ranking(all_matches):
-	"""List the final rankings for all participating teams."""
+def find_player(t_player, leaderboard, symbols):
+	"""Return the symbol of a player by exact or titlecase name, or None
+	if no scorer has that name."""
+	
+	pid = symbols.IDs.get(t_player)
+	if pid not in leaderboard.Counts:
+		for player in leaderboard.Counts:
+			if symbols.name(player).title() == t_player:
+				return player
+	return pid
+
+
+def display_scorer_rank(out, t_player, leaderboard, symbols):
+	"""Show the goals and rank of one player."""
 	
-	if not all_matches[-1].Finished or all_matches[-1].Type != "Final":
-		print("\nNot available until World Cup is over.\n")
-		return 0
+	t_player = t_player.replace("_", " ")
+	pid = find_player(t_player, leaderboard, symbols)
 	
-	print("\n********** Team Rankings **********\n")
-	rnk_struct = "Champion:         {0}\nRunners-up:       {1}\n"
-	rnk_struct += "Third Place:      {2}\nFourth Place:     {3}\n"
-	rnk_struct += "No. 5 - No. 8:    {4[0]}, {4[1]}, {4[2]}, {4[3]}\n"
-	rnk_struct += "No. 9 - No. 16:   {5[0]}, {5[1]}, {5[2]}, {5[3]}, "
-	rnk_struct += "{5[4]}, {5[5]}, {5[6]}, {5[7]}\n"
+	found = leaderboard.rank(pid)
+	if found is None:
+		print("{} not found".format(t_player), file=out)
+		return 2
+	
+	print("\n{:2}   {:^25}      {}".format(" #", "Name", "Goals"), file=out)
+	print("{:2}   {:^25}      {}\n".format(found[1], symbols.name(pid), found[0]), file=out)
+	return 0
+
+
+def final_ranking(all_matches):
+	"""Return the champion, the runners-up, the third and fourth place
+	and the losers of the Round of 8 and of the Round of 16."""
 	
 	b8 = []
 	b16 = []
@@ -134,113 +155,228 @@ def display_ranking(all_matches):
 		elif match.Type == "Round of 16":
 			b16.append(match.Loser)
 	
-	rnk_final = rnk_struct.format(n1, n2, n3, n4, b8, b16)
-	print(rnk_final)
+	return n1, n2, n3, n4, b8, b16
+
+
+def display_ranking(out, all_matches, symbols):
+	"""List the final rankings for all participating teams."""
+	
+	if not all_matches[-1].Finished or all_matches[-1].Type != "Final":
+		print("\nNot available until World Cup is over.\n", file=out)
+		return 0
+	
+	print("\n********** Team Rankings **********\n", file=out)
+	rnk_struct = "Champion:         {0}\nRunners-up:       {1}\n"
+	rnk_struct += "Third Place:      {2}\nFourth Place:     {3}\n"
+	rnk_struct += "No. 5 - No. 8:    {4[0]}, {4[1]}, {4[2]}, {4[3]}\n"
+	rnk_struct += "No. 9 - No. 16:   {5[0]}, {5[1]}, {5[2]}, {5[3]}, "
+	rnk_struct += "{5[4]}, {5[5]}, {5[6]}, {5[7]}\n"
+	
+	n1, n2, n3, n4, b8, b16 = final_ranking(all_matches)
+	b8 = [symbols.name(t) for t in b8]
+	b16 = [symbols.name(t) for t in b16]
+	rnk_final = rnk_struct.format(symbols.name(n1), symbols.name(n2),
+								  symbols.name(n3), symbols.name(n4), b8, b16)
+	print(rnk_final, file=out)
 	
 	return 0
 
 
-def display_structure(all_groups):
+def display_structure(out, all_groups, symbols):
 	"""List all participating teams in group strcuture."""
 	
-	print("\n********** All Groups **********\n")
-	
-	grp_struct = "{:=^20}\n"
-	grp_struct += "{:^20}\n" * 4
-	grp_struct += "{:=^20}\n"
+	print("\n********** All Groups **********\n", file=out)
 	
 	for group in all_groups:
 		g_name = "Group " + group.ID
-		g0 = group.Teams[0]
-		g1 = group.Teams[1]
-		g2 = group.Teams[2]
-		g3 = group.Teams[3]
 		g_end = group.ID + " Group"
 		
-		grp = grp_struct.format(g_name, g0, g1, g2, g3, g_end)
-		print(grp)
+		grp_struct = "{:=^20}\n"
+		grp_struct += "{:^20}\n" * len(group.Teams)
+		grp_struct += "{:=^20}\n"
+		
+		grp = grp_struct.format(g_name, *[symbols.name(t) for t in group.Teams], g_end)
+		print(grp, file=out)
 	
 	return 0
 
 
-def display_bracket(all_matches):
-	"""Draw the current knockout round bracket."""
-	
-	bkt_struct = "##{1[0]:^20} {1[1]:^20} {1[2]:^20} {1[3]:^20} {1[4]:^20}\n"
-	bkt_struct += "  {0:20} {0:20} {0:20} {1[5]:^20} {1[6]:^20}\n"
-	bkt_struct += "A1{2[0]:—^20}|\n"								#3
-	bkt_struct += "  {0:20}|{3[0]:—^20}|\n"							#4
-	bkt_struct += "B2{2[1]:—^20}|{0:20}|\n"							#5
-	bkt_struct += "  {0:20} {0:20}|{4[0]:—^20}|\n"					#6
-	bkt_struct += "C1{2[2]:—^20}|{0:20}|{0:20}|\n"					#7
-	bkt_struct += "  {0:20}|{3[1]:—^20}|{0:20}|\n"					#8
-	bkt_struct += "D2{2[3]:—^20}|{0:20} {0:20}|\n"					#9
-	bkt_struct += "  {0:20} {0:20} {0:20}|{6[0]:—^20}|\n"			#10
-	bkt_struct += "E1{2[4]:—^20}|{0:20} {0:20}|{0:20}|\n"			#11
-	bkt_struct += "  {0:20}|{3[2]:—^20}|{0:20}|{0:20}|\n"			#12
-	bkt_struct += "F2{2[5]:—^20}|{0:20}|{0:20}|{0:20}|\n"			#13
-	bkt_struct += "  {0:20} {0:20}|{4[1]:—^20}|{0:20}|\n"			#14
-	bkt_struct += "G1{2[6]:—^20}|{0:20}|{0:20} {0:20}|\n"			#15
-	bkt_struct += "  {0:20}|{3[3]:—^20}|{0:20} {0:20}|\n"			#16
-	bkt_struct += "H2{2[7]:—^20}|{0:20} {0:20} {0:20}|\n"			#17
-	bkt_struct += "  {0:20} {0:20} {0:20} {0:20}|{8:—^20}\n"		#18
-	bkt_struct += "B1{2[8]:—^20}|{0:20} {0:20} {0:20}|\n"			#19
-	bkt_struct += "  {0:20}|{3[4]:—^20}|{0:20} {0:20}|\n"			#20
-	bkt_struct += "A2{2[9]:—^20}|{0:20}|{0:20} {0:20}|\n"			#21
-	bkt_struct += "  {0:20} {0:20}|{4[2]:—^20}|{0:20}|\n"			#22
-	bkt_struct += "D1{2[10]:—^20}|{0:20}|{0:20}|{0:20}|\n"			#23
-	bkt_struct += "  {0:20}|{3[5]:—^20}|{0:20}|{0:20}|\n"			#24
-	bkt_struct += "C2{2[11]:—^20}|{0:20} {0:20}|{0:20}|\n"			#25
-	bkt_struct += "  {0:20} {0:20} {0:20}|{6[1]:—^20}|\n"			#26
-	bkt_struct += "F1{2[12]:—^20}|{0:20} {0:20}|\n"					#27
-	bkt_struct += "  {0:20}|{3[6]:—^20}|{0:20}|\n"					#28
-	bkt_struct += "E2{2[13]:—^20}|{0:20}|{0:20}|\n"					#29
-	bkt_struct += "  {0:20} {0:20}|{4[3]:—^20}|\n"					#30
-	bkt_struct += "H1{2[14]:—^20}|{0:20}|{0:20} {5[0]:—^20}|\n"		#31
-	bkt_struct += "  {0:20}|{3[7]:—^20}|{0:20} {0:20}|{7:—^20}\n"	#32
-	bkt_struct += "G2{2[15]:—^20}|{0:20} {0:20} {5[1]:—^20}|\n"		#33
-	
-	mts = [m for m in range(49)]	# padding numbers for easy indexing.
-	mts += (sorted(all_matches, key=lambda i: i.Index))[48:]
-	for mt in mts[49:]:
-		mt.Teams = list(mt.Teams)
-		if mt.Teams[0] == "":
-			mt.Teams[0] = "TBD"
-		if mt.Teams[1] == "":
-			mt.Teams[1] = "TBD"
-		if mt.Index == 63 or mt.Index == 64:
-			if mt.Winner == "":
-				mt.Winner = "TBD"
-	
-	titles = ["Round of 16", "Round of 8", "Semi_finals",
-			  "Final", "Champion", "3rd Place Playoff", "3rd Place"]
-	
-	r16 = [mts[49].Teams[0], mts[49].Teams[1],
-		   mts[50].Teams[0], mts[50].Teams[1],
-		   mts[53].Teams[0], mts[53].Teams[1],
-		   mts[54].Teams[0], mts[54].Teams[1],
-		   mts[51].Teams[0], mts[51].Teams[1],
-		   mts[52].Teams[0], mts[52].Teams[1],
-		   mts[55].Teams[0], mts[55].Teams[1],
-		   mts[56].Teams[0], mts[56].Teams[1]]
-	
-	r8 = [mts[57].Teams[0], mts[57].Teams[1],
-		  mts[58].Teams[0], mts[58].Teams[1],
-		  mts[59].Teams[0], mts[59].Teams[1],
-		  mts[60].Teams[0], mts[60].Teams[1]]
-	
-	r4 = [mts[61].Teams[0], mts[61].Teams[1],
-		  mts[62].Teams[0], mts[62].Teams[1]]
-	
-	r3o = [mts[63].Teams[0], mts[63].Teams[1]]
-	r2 = [mts[64].Teams[0], mts[64].Teams[1]]
-	r3 = mts[63].Winner
-	r1 = mts[64].Winner
-	
-	bkt = bkt_struct.format("", titles, r16, r8, r4, r3o, r2, r3, r1)
-	
-	print("\n********** World Cup Bracket **********\n")
-	print(bkt)
+def bracket_labels(bracket, all_groups):
+	"""Label the first knockout round teams with their group and their
+	place among the teams of that group that went through(e.g. A1)."""
+	
+	first = bracket.first_round()
+	labels = {}
+	for group in all_groups:
+		through = [t for t in group.Standings.Order
+				   if any(t in match.Teams for match in first)]
+		for n, team in enumerate(through):
+			labels[team] = "{}{}".format(group.ID, n + 1)
+	return labels
+
+
+def display_bracket(out, bracket, all_groups, symbols):
+	"""Draw the current knockout round bracket. Each round is a column of
+	the teams that reached it, joined by lines to the next round."""
+	
+	if bracket.Root is None:
+		print("\nNo knockout matches yet.\n", file=out)
+		return 0
+	
+	def tn(t_sid):
+		"""Resolve a team symbol, undecided teams are shown as TBD."""
+		return symbols.name(t_sid) or "TBD"
+	
+	labels = bracket_labels(bracket, all_groups)
+	
+	cells = {}
+	spans = {}
+	rows = []
+	
+	def place(t_mid, col):
+		"""Lay out a match and its feeders, return the row in between its
+		two teams."""
+		
+		match, feeders = bracket.node(t_mid)
+		t_rows = []
+		for n, team in enumerate(match.Teams[:2]):
+			if n < len(feeders):
+				row = place(feeders[n], col - 1)
+				f_match = bracket.node(feeders[n])[0]
+				if f_match.Winner in match.Teams and f_match.Winner != NO_NAME:
+					team = f_match.Winner
+			else:
+				row = len(rows) * 2
+				rows.append(labels.get(team, "  "))
+			cells[(row, col)] = tn(team)
+			t_rows.append(row)
+		spans.setdefault(col, []).append((t_rows[0], t_rows[-1]))
+		return (t_rows[0] + t_rows[-1]) // 2
+	
+	top = len(bracket.Rounds)
+	center = place(bracket.Root.ID, top - 1)
+	cells[(center, top)] = tn(bracket.Root.Winner)
+	
+	third = bracket.Third
+	if third is not None and len(rows) > 1:
+		t_rows = (len(rows) * 2 - 4, len(rows) * 2 - 2)
+		for row, team in zip(t_rows, third.Teams):
+			cells[(row, top - 1)] = tn(team)
+		spans[top - 1].append(t_rows)
+		cells[(t_rows[0] + 1, top)] = tn(third.Winner)
+	
+	titles = [r_type.replace("Semi-final", "Semi_finals") for r_type in bracket.Rounds]
+	bkt = "##" + " ".join("{:^20}".format(title) for title in titles + ["Champion"])
+	if third is not None:
+		bkt += "\n  " + "{:20} ".format("") * (top - 1)
+		bkt += "{:^20} {:^20}".format("3rd Place Playoff", "3rd Place")
+	bkt += "\n"
+	
+	for row in range(len(rows) * 2 - 1):
+		line = rows[row // 2] if row % 2 == 0 else "  "
+		for col in range(top + 1):
+			if (row, col) in cells:
+				line += "{:—^20}".format(cells[(row, col)])
+			else:
+				line += "{:20}".format("")
+			if any(a <= row <= b for a, b in spans.get(col, [])):
+				line += "|"
+			else:
+				line += " "
+		bkt += line.rstrip() + "\n"
+	
+	print("\n********** World Cup Bracket **********\n", file=out)
+	print(bkt, file=out)
 	
 	return 0
 
+
+def display_prediction(out, get_prediction):
+	"""List every team's chances of reaching each knockout round and of
+	winning the title, from the runs simulated by get_prediction()."""
+	
+	prediction = get_prediction()
+	if not prediction.Rounds:
+		print("\nNo knockout matches to predict.\n", file=out)
+		return 0
+	
+	print("\n********** Predicted Outcomes **********\n", file=out)
+	print("{} runs, {} matches left to play\n".format(prediction.Runs,
+												   prediction.Unfinished), file=out)
+	
+	titles = [r_type.replace("Semi-final", "Semi_finals") for r_type in prediction.Rounds]
+	titles.append("Champion")
+	print("{:16}".format("Team") + "".join("{:>13}".format(t) for t in titles), file=out)
+	for name, chances, title in prediction.rows():
+		line = "{:16}".format(name)
+		line += "".join("{:>12.1f}%".format(c * 100) for c in chances + [title])
+		print(line, file=out)
+	
+	print("", file=out)
+	return 0
+
+
+def display_all_time_teams(out, get_stats):
+	"""List the all-time record of every team over the tournaments."""
+	
+	stats = get_stats()
+	print("\n********** All-Time Team Records **********\n", file=out)
+	print("World Cups: {}\n".format(", ".join(stats.Years)), file=out)
+	
+	std = "{:<16}{:>3}{:>5}{:>4}{:>4}{:>4}{:>5}{:>5}{:>6}{:>8}"
+	print(std.format("Team", "WC", "MP", "W", "D", "L", "GF", "GA", "Pts", "Titles"),
+		  file=out)
+	for team, row, pts in stats.team_rows():
+		wcs, mp, w, d, l, gf, ga, titles = row
+		print(std.format(team, wcs, mp, w, d, l, gf, ga, pts, titles), file=out)
+	
+	print("", file=out)
+	return 0
+
+
+def display_all_time_scorers(out, get_stats, top_n=None):
+	"""List the all-time scorers(or the best top_n) over the tournaments
+	from most to least."""
+	
+	if top_n is not None and top_n < 1:
+		return 1
+	
+	stats = get_stats()
+	scorer_list = stats.scorer_rows(top_n)
+	if not scorer_list:
+		print("No goals yet\n", file=out)
+		return 0
+	
+	print("\n********** All-Time Scorers **********\n", file=out)
+	print("World Cups: {}\n".format(", ".join(stats.Years)), file=out)
+	print("{:2}   {:^25}      {}   {}".format(" #", "Name", "Goals", "WC"), file=out)
+	
+	amt = None
+	rank = 0
+	for name, amount, wcs in scorer_list:
+		if amount != amt:
+			rank += 1
+			amt = amount
+		print("{:2}   {:^25}      {:>5}   {:>2}".format(rank, name, amount, wcs), file=out)
+	
+	print("", file=out)
+	return 0
+
+
+def display_all_time_hosts(out, get_stats):
+	"""List how the hosts did in their own tournaments."""
+	
+	stats = get_stats()
+	h_rows = stats.host_rows()
+	if not h_rows:
+		print("\nNo host team found in the tournaments.\n", file=out)
+		return 0
+	
+	print("\n********** Host Performance **********\n", file=out)
+	std = "{:<6}{:<16}{:>3}{:>4}{:>4}{:>4}{:>5}{:>5}   {}"
+	print(std.format("Year", "Host", "MP", "W", "D", "L", "GF", "GA", "Result"), file=out)
+	for year, wc_host, team, status, row in h_rows:
+		print(std.format(year, team, *row, status), file=out)
+	
+	print("", file=out)
+	return 0
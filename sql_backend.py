@@ -0,0 +1,198 @@
+# sql_backend.py #
+# =====================================================================
+# DEFINE AN OPTIONAL SQLITE STORAGE FOR TOURNAMENT DATA, AS AN
+# ALTERNATIVE TO KEEPING EACH TOURNAMENT IN ITS OWN JSON FILE.
+# 
+# THE JSON LAYOUT OF data_template.json IS SPLIT INTO NORMALIZED TABLES
+# (TOURNAMENTS, MATCHES, GOALS, GROUPS, GROUP TEAMS, GROUP MATCHES AND
+# AWARDS), KEYED BY YEAR. ONE DATABASE CAN HOLD ANY NUMBER OF
+# TOURNAMENTS.
+# 
+# THE DATABASE IS STORAGE ONLY: A TOURNAMENT IS EXPORTED BACK TO THE
+# JSON LAYOUT AND BUILT INTO THE SAME IN-MEMORY MODEL AS A DATA FILE,
+# SO EVERY COMMAND WORKS ON IT UNCHANGED AND NOTHING IS LOOKED UP IN
+# THE DATABASE AFTER THAT. BROWSING OPENS THE DATABASE READ-ONLY, ONLY
+# "import" CREATES OR WRITES IT.
+# 
+# COMMANDS: python3 sql_backend.py import <data file> [database]
+#           python3 sql_backend.py export <year> <data file> [database]
+#           python3 sql_backend.py list [database]
+# 
+
+import json
+import os
+import sqlite3
+import sys
+from urllib.request import pathname2url
+
+from special_classes import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tournaments (
+	year TEXT PRIMARY KEY, host TEXT, number TEXT);
+CREATE TABLE IF NOT EXISTS matches (
+	year TEXT, id TEXT, idx INTEGER, tzone INTEGER, team0 TEXT, team1 TEXT,
+	type TEXT, grp TEXT, feeders TEXT, stadium TEXT, finished INTEGER,
+	winner TEXT, motm TEXT, slots TEXT, PRIMARY KEY (year, id));
+CREATE TABLE IF NOT EXISTS goals (
+	year TEXT, mid TEXT, seq INTEGER, type TEXT, team TEXT, minute INTEGER,
+	player TEXT, PRIMARY KEY (year, mid, seq));
+CREATE TABLE IF NOT EXISTS groups (
+	year TEXT, id TEXT, seq INTEGER, PRIMARY KEY (year, id));
+CREATE TABLE IF NOT EXISTS group_teams (
+	year TEXT, grp TEXT, seq INTEGER, team TEXT, PRIMARY KEY (year, grp, seq));
+CREATE TABLE IF NOT EXISTS group_matches (
+	year TEXT, grp TEXT, seq INTEGER, mid TEXT, PRIMARY KEY (year, grp, seq));
+CREATE TABLE IF NOT EXISTS awards (
+	year TEXT, seq INTEGER, award TEXT, winner TEXT, PRIMARY KEY (year, seq));
+"""
+
+
+def connect(t_db_path, writable=False):
+	"""Open an existing database read-only, or open(or create) it for
+	writing and make sure the tables exist."""
+	
+	if not writable:
+		if not os.path.isfile(t_db_path):
+			raise FileNotFoundError("Database not found: {}".format(t_db_path))
+		uri = "file:{}?mode=ro".format(pathname2url(os.path.abspath(t_db_path)))
+		return sqlite3.connect(uri, uri=True)
+	
+	conn = sqlite3.connect(t_db_path)
+	conn.executescript(SCHEMA)
+	
+	# databases made before match slots were stored.
+	if not has_slots(conn):
+		conn.execute("ALTER TABLE matches ADD COLUMN slots TEXT")
+	return conn
+
+
+def has_slots(conn):
+	"""Tell if the matches table stores match slots."""
+	
+	return "slots" in [row[1] for row in conn.execute("PRAGMA table_info(matches)")]
+
+
+def import_data(conn, raw_data):
+	"""Store a tournament from raw json data, replacing the stored one
+	of the same year."""
+	
+	year = raw_data["Meta"]["Year"]
+	
+	with conn:
+		for table in ("tournaments", "matches", "goals", "groups", "group_teams",
+					  "group_matches", "awards"):
+			conn.execute("DELETE FROM {} WHERE year = ?".format(table), (year,))
+		
+		j_meta = raw_data["Meta"]
+		conn.execute("INSERT INTO tournaments VALUES (?, ?, ?)",
+					 (year, j_meta["Host"], j_meta["Tournament_No."]))
+		
+		for j_match in raw_data["Matches"]:
+			feeders = j_match.get("Feeders")
+			slots = j_match.get("Slots")
+			conn.execute("INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+						 (year, j_match["ID"], j_match["Index"], j_match["Tzone"],
+						  j_match["Teams"][0], j_match["Teams"][1], j_match["Type"],
+						  j_match["Group"], json.dumps(feeders) if feeders else None,
+						  j_match["Stadium"], int(j_match["Finished"]),
+						  j_match["Winner"], j_match["Man_of_the_Match"],
+						  json.dumps(slots) if slots else None))
+			conn.executemany("INSERT INTO goals VALUES (?, ?, ?, ?, ?, ?, ?)",
+							 [(year, j_match["ID"], n, j_goal["Type"], j_goal["Team"],
+							   j_goal["When"], j_goal["Player"])
+							  for n, j_goal in enumerate(j_match["Goals"])])
+		
+		for n, j_group in enumerate(raw_data["Groups"]):
+			conn.execute("INSERT INTO groups VALUES (?, ?, ?)", (year, j_group["ID"], n))
+			conn.executemany("INSERT INTO group_teams VALUES (?, ?, ?, ?)",
+							 [(year, j_group["ID"], k, team)
+							  for k, team in enumerate(j_group["Teams"])])
+			conn.executemany("INSERT INTO group_matches VALUES (?, ?, ?, ?)",
+							 [(year, j_group["ID"], k, mid)
+							  for k, mid in enumerate(j_group["Matches"])])
+		
+		conn.executemany("INSERT INTO awards VALUES (?, ?, ?, ?)",
+						 [(year, n, award, winner)
+						  for n, (award, winner) in enumerate(raw_data["Awards"].items())])
+
+
+def stored_years(conn):
+	"""Return the years of the stored tournaments in order."""
+	
+	return [row[0] for row in conn.execute("SELECT year FROM tournaments ORDER BY year")]
+
+
+def export_data(conn, t_year):
+	"""Return a stored tournament in raw json data layout."""
+	
+	row = conn.execute("SELECT host, number FROM tournaments WHERE year = ?",
+					   (t_year,)).fetchone()
+	if row is None:
+		raise KeyError(t_year)
+	
+	goals = {}
+	for mid, g_type, team, minute, player in conn.execute(
+			"SELECT mid, type, team, minute, player FROM goals WHERE year = ? "
+			"ORDER BY mid, seq", (t_year,)):
+		goals.setdefault(mid, []).append({"Type": g_type, "MID": mid, "Team": team,
+										  "When": minute, "Player": player})
+	
+	matches = []
+	for (mid, idx, tzone, team0, team1, m_type, grp, feeders, stadium, finished,
+		 winner, motm, slots) in conn.execute(
+			"SELECT id, idx, tzone, team0, team1, type, grp, feeders, stadium, "
+			"finished, winner, motm, {} FROM matches WHERE year = ? ORDER BY idx".format(
+			"slots" if has_slots(conn) else "NULL"), (t_year,)):
+		j_match = {"ID": mid, "Index": idx, "Tzone": tzone, "Teams": [team0, team1],
+				   "Type": m_type, "Group": grp, "Stadium": stadium,
+				   "Finished": bool(finished), "Goals": goals.get(mid, []),
+				   "Winner": winner, "Man_of_the_Match": motm}
+		if feeders:
+			j_match["Feeders"] = json.loads(feeders)
+		if slots:
+			j_match["Slots"] = json.loads(slots)
+		matches.append(j_match)
+	
+	groups = []
+	for (g_id,) in conn.execute("SELECT id FROM groups WHERE year = ? ORDER BY seq",
+								(t_year,)):
+		teams = [r[0] for r in conn.execute(
+			"SELECT team FROM group_teams WHERE year = ? AND grp = ? ORDER BY seq",
+			(t_year, g_id))]
+		mids = [r[0] for r in conn.execute(
+			"SELECT mid FROM group_matches WHERE year = ? AND grp = ? ORDER BY seq",
+			(t_year, g_id))]
+		groups.append({"ID": g_id, "Teams": teams, "Matches": mids})
+	
+	awards = dict(conn.execute("SELECT award, winner FROM awards WHERE year = ? "
+							   "ORDER BY seq", (t_year,)).fetchall())
+	
+	return {"Meta": {"Year": t_year, "Host": row[0], "Tournament_No.": row[1]},
+			"Matches": matches, "Groups": groups, "Awards": awards}
+
+
+def load_tournament(conn, t_year):
+	"""Build the model of a stored tournament. The whole model is built
+	in memory, as from a data file."""
+	
+	return Tournament(export_data(conn, t_year))
+
+
+if __name__ == "__main__":
+	
+	if len(sys.argv) > 2 and sys.argv[1] == "import":
+		db_conn = connect(sys.argv[3] if len(sys.argv) > 3 else "fifa_data.db", True)
+		with open(sys.argv[2], "rb") as jp:
+			import_data(db_conn, json.load(jp))
+	elif len(sys.argv) > 3 and sys.argv[1] == "export":
+		db_conn = connect(sys.argv[4] if len(sys.argv) > 4 else "fifa_data.db")
+		with open(sys.argv[3], "w", encoding="utf-8") as jp:
+			json.dump(export_data(db_conn, sys.argv[2]), jp, indent=4, ensure_ascii=False)
+	elif len(sys.argv) > 1 and sys.argv[1] == "list":
+		db_conn = connect(sys.argv[2] if len(sys.argv) > 2 else "fifa_data.db")
+		print("\n".join(stored_years(db_conn)))
+	else:
+		sys.exit("Usage: python3 sql_backend.py import <data file> [database]\n"
+				 "       python3 sql_backend.py export <year> <data file> [database]\n"
+				 "       python3 sql_backend.py list [database]")
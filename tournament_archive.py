@@ -0,0 +1,186 @@
+# tournament_archive.py #
+# =====================================================================
+# DEFINE AN ARCHIVE OF SEVERAL TOURNAMENTS(e.g. EVERY WORLD CUP SINCE
+# 1930), ONE DATA FILE EACH.
+# 
+# THE ARCHIVE IS EITHER A DIRECTORY OF DATA FILES OR A MANIFEST FILE:
+# {"Tournaments": ["1930.json", "1934.json", ...]}
+# WITH PATHS RELATIVE TO THE MANIFEST.
+# 
+# ONLY THE "Meta" BLOCK OF EACH FILE IS READ AT STARTUP. A TOURNAMENT
+# MODEL IS BUILT(OR RESTORED FROM ITS SNAPSHOT) THE FIRST TIME IT IS
+# USED, AND ONLY THE MOST RECENTLY USED ONES STAY IN MEMORY.
+# 
+# TABLES OVER THE WHOLE ARCHIVE(HEAD-TO-HEAD RECORDS, ALL-TIME TABLES)
+# ARE BUILT ONCE AND AGAIN ONLY IF A LOADED TOURNAMENT CHANGED. THEY
+# ARE BUILT FROM PLAIN DATA REDUCED FROM EACH TOURNAMENT, SO NO MODEL
+# BEYOND THE RESIDENT ONES STAYS IN MEMORY. TOURNAMENTS THAT ARE NOT
+# LOADED CAN BE REDUCED IN WORKER PROCESSES, FOR WHICH THE LOADER MUST
+# BE PICKLABLE(e.g. A MODULE LEVEL FUNCTION).
+# 
+
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from special_classes import *
+from all_time import *
+
+
+def read_meta(t_data_path, chunk=65536):
+	"""Return the Meta block of a data file without parsing the rest,
+	unless Meta does not come first."""
+	
+	with open(t_data_path, "rb") as jp:
+		head = jp.read(chunk).decode("utf-8", "ignore")
+	
+	at = head.find('"Meta"')
+	if at >= 0:
+		at = head.index(":", at) + 1
+		try:
+			return json.JSONDecoder().raw_decode(head[at:].lstrip())[0]
+		except ValueError:
+			pass
+	
+	with open(t_data_path, "rb") as jp:
+		return json.load(jp)["Meta"]
+
+
+def archive_paths(t_path):
+	"""Return the data files of an archive directory or manifest."""
+	
+	if os.path.isdir(t_path):
+		return [os.path.join(t_path, name) for name in sorted(os.listdir(t_path))
+				if name.endswith(".json")]
+	
+	with open(t_path, "rb") as mp:
+		manifest = json.load(mp)
+	base = os.path.dirname(t_path)
+	return [os.path.join(base, name) for name in manifest["Tournaments"]]
+
+
+class TournamentArchive:
+	"""Index the tournaments of an archive by year and keep at most
+	"resident" of them loaded."""
+	
+	__slots__ = ("Paths", "Metas", "Loader", "Resident", "Workers", "Loaded",
+				 "Current", "Head_to_head", "All_time")
+	
+	def __init__(self, t_path, loader, resident=4, workers=1):
+		"""The loader turns a data file path into a Tournament. Up to
+		"workers" processes build the all-time tables."""
+		
+		self.Paths = {}
+		self.Metas = {}
+		for d_path in archive_paths(t_path):
+			meta = read_meta(d_path)
+			self.Paths[meta["Year"]] = d_path
+			self.Metas[meta["Year"]] = meta
+		
+		if not self.Paths:
+			raise ValueError("No tournaments found in {}".format(t_path))
+		
+		self.Loader = loader
+		self.Resident = max(1, resident)
+		self.Workers = max(1, workers)
+		self.Loaded = OrderedDict()
+		self.Current = self.years()[-1]
+		# (versions of the tournaments it was built from, HeadToHead).
+		self.Head_to_head = None
+		# (versions of the tournaments it was built from, AllTimeStats).
+		self.All_time = None
+	
+	def years(self):
+		"""Return the years of the archive in order."""
+		
+		return sorted(self.Paths)
+	
+	def get(self, t_year):
+		"""Return the model of a year, loading it on first use and
+		unloading the least recently used one beyond the bound."""
+		
+		wc = self.Loaded.get(t_year)
+		if wc is not None:
+			self.Loaded.move_to_end(t_year)
+			return wc
+		
+		wc = self.Loader(self.Paths[t_year])
+		self.Loaded[t_year] = wc
+		if len(self.Loaded) > self.Resident:
+			self.Loaded.popitem(last=False)
+		return wc
+	
+	def current(self):
+		"""Return the model of the tournament in use."""
+		
+		return self.get(self.Current)
+	
+	def use(self, t_year):
+		"""Switch to another tournament, return False for unknown years."""
+		
+		if t_year not in self.Paths:
+			return False
+		self.Current = t_year
+		return True
+	
+	def reduce(self, reduce_fn, load_fn):
+		"""Return year -> (data version, reduce_fn(model)) over the whole
+		archive. Loaded tournaments are reduced in this process, the others
+		are loaded and reduced by load_fn(in the worker processes if there
+		are several) and only the reduced data is kept, so the resident
+		bound holds."""
+		
+		found = {}
+		for year, wc in self.Loaded.items():
+			found[year] = (wc.Version, reduce_fn(wc))
+		
+		rest = [year for year in self.years() if year not in found]
+		r_paths = [self.Paths[year] for year in rest]
+		if self.Workers > 1 and len(rest) > 1:
+			with ProcessPoolExecutor(min(self.Workers, len(rest))) as pool:
+				found.update(zip(rest, pool.map(load_fn, repeat(self.Loader), r_paths)))
+		else:
+			found.update(zip(rest, map(load_fn, repeat(self.Loader), r_paths)))
+		
+		return found
+	
+	def head_to_head(self):
+		"""Return the head-to-head records over the whole archive. It is
+		built once and again only if a loaded tournament changed since."""
+		
+		if self.Head_to_head is not None:
+			versions, h2h = self.Head_to_head
+			if all(versions[year] == wc.Version for year, wc in self.Loaded.items()):
+				return h2h
+		
+		found = self.reduce(tournament_meetings, load_meetings)
+		h2h = HeadToHead()
+		for year in self.years():
+			h2h.add(found[year][1])
+		self.Head_to_head = ({year: found[year][0] for year in found}, h2h)
+		return h2h
+	
+	def all_time(self):
+		"""Return the all-time tables over the whole archive, merged from
+		the totals of each tournament."""
+		
+		if self.All_time is not None:
+			versions, stats = self.All_time
+			if all(versions[year] == wc.Version for year, wc in self.Loaded.items()):
+				return stats
+		
+		found = self.reduce(tournament_totals, load_totals)
+		stats = AllTimeStats(found[year][1] for year in self.years())
+		self.All_time = ({year: found[year][0] for year in found}, stats)
+		return stats
+	
+	def display_years(self, out):
+		"""List the tournaments of the archive."""
+		
+		print("\n----- Tournaments -----\n", file=out)
+		for year in self.years():
+			mark = "*" if year == self.Current else " "
+			print("{} {}  {}".format(mark, year, self.Metas[year]["Host"]), file=out)
+		print("", file=out)
@@ -8,10 +8,17 @@
 # CERTAIN AREAS WILL HAVE AN EXTRA ID FOR DAYLIGHT SAVING TIME
 # (e.g. EDT is the daylight saving time version for EST).
 # 
+# MATCH KICKOFF TIMES ARE STORED AS UTC EPOCH SECONDS WHEN THE DATA IS
+# LOADED, SO CONVERTING TO A TIME ZONE IS A SINGLE OFFSET ADDITION.
+# 
 # A MAIN FUNCTION IS BUILT FOR TESTING WITH TESTING SAMPLES.
 # TEST RUN COMMAND: python3 tzone_convert.py
 # 
 
+import calendar
+import time
+from functools import lru_cache
+
 tz_sheet = {
 	"ACDT": 10.5, "ACST": 9.5, "ACT": -5, "ADT": -3, "AEDT": 11, 
 	"AEST": 10, "AFT": 4.5, "AKDT": -8, "AKST": -9, "AMST": -3, 
@@ -41,69 +48,61 @@ tz_sheet = {
 }
 
 
-def tz_digest(t_MID, t_ult, t_rlt):
-	"""Calculate the match time in user's time zone."""
-	
-	ti_msg = "{} {:02} @ {:02}:{:02} {}"
+# offsets in seconds, so a conversion is a single integer addition.
+tz_offset = {tz: int(diff * 3600) for tz, diff in tz_sheet.items()}
+
+
+def kickoff_utc(t_MID, t_year, t_rlt):
+	"""Return the UTC epoch of a match kickoff from its ID(MMDDHH in
+	the host's local time), the tournament year and the host offset."""
 	
 	# parse the match ID.
 	mo = int(t_MID[:2])
 	day = int(t_MID[2:4])
 	hr = int(t_MID[4:6])
-	mi = 0
 	
-	# calculate the time difference.
-	if t_ult.title() == "Local":
-		ti_diff = 0
-	else:
-		ti_diff = tz_sheet[t_ult] - t_rlt
+	local = calendar.timegm((int(t_year), mo, day, hr, 0, 0))
 	
-	if isinstance(ti_diff, float):
-		mi = int((ti_diff - int(ti_diff)) * 60)
-		ti_diff = int(ti_diff)
-	if mi < 0:
-		hr -= 1
-		mi = abs(mi)
+	return local - int(t_rlt * 3600)
+
 
-	hr = hr + ti_diff
-	if 0 <= hr < 24:
-		pass
-	elif hr < 0:
-		day -= 1
-		hr += 24
-	elif hr >= 24:
-		day += 1
-		hr -= 24
+@lru_cache(maxsize=1024)
+def tz_digest(t_kickoff, t_ult, t_rlt):
+	"""Calculate the match time in user's time zone, results are cached
+	per match and time zone so switching back and forth is free."""
 	
-	if 1 <= day <= 30:
-		pass
-	elif day == 0:
-		mo = 6
-		day = 30
-	elif day == 31:
-		mo = 7
-		day = 1
+	ti_msg = "{} {:02} @ {:02}:{:02} {}"
 	
-	if mo == 6:
-		mo = "June"
-	elif mo == 7:
-		mo = "July"
+	# calculate the time difference.
+	if t_ult.title() == "Local":
+		ti_diff = int(t_rlt * 3600)
+	else:
+		ti_diff = tz_offset[t_ult]
 	
-	ti_msg = ti_msg.format(mo, day, hr, mi, t_ult)
+	lt = time.gmtime(t_kickoff + ti_diff)
+	ti_msg = ti_msg.format(calendar.month_name[lt.tm_mon], lt.tm_mday,
+						   lt.tm_hour, lt.tm_min, t_ult)
 	
 	return ti_msg
 
 
+def tz_valid(t_tz):
+	"""Return the normalized time zone value, or None if it is unknown."""
+	
+	if t_tz.upper() in tz_sheet.keys():
+		return t_tz.upper()
+	elif t_tz.title() == "Local":
+		return t_tz.title()
+	else:
+		return None
+
+
 def tz_setup():
 	"""Return a valid user local time zone value."""
 	
 	while True:
-		user_tz = input("\nPlease enter your time zone (e.g. EDT):\n")
-		if user_tz.upper() in tz_sheet.keys():
-			user_tz = user_tz.upper()
-			break
-		elif user_tz.title() == "Local":
-			user_tz = user_tz.title()
+		user_tz = tz_valid(input("\nPlease enter your time zone (e.g. EDT):\n"))
+		if user_tz is not None:
 			break
 		else:
 			print("\nInvalid time zone, please try again.")
@@ -119,10 +118,10 @@ if __name__ == "__main__":
 	test_set = [
 	("061418", "EST", 3), ("061418", "EDT", 3), ("061418", "NPT", 4), 
 	("061521", "CDT", 4), ("061517", "CT", 3), ("061518", "CCT", 4),
-	("061518", "Local", 4)
+	("061518", "Local", 4), ("063001", "EDT", 3), ("123123", "AEDT", 3)
 	]
 	
 	print("\n")
 	for mid, ult, rlt in test_set:
-		print(tz_digest(mid, ult, rlt))
+		print(tz_digest(kickoff_utc(mid, 2018, rlt), ult, rlt))
 	print("\n")